@@ -0,0 +1,300 @@
+import frappe
+from frappe import _
+from frappe.model.naming import parse_naming_series
+from frappe.query_builder import Case, Order
+from frappe.utils import add_days, cint, date_diff, getdate, nowdate
+from pypika.analytics import RowNumber
+
+from checktrack_connector.assignment import TechnicianLoadIndex
+from checktrack_connector.checktrack_connector.doctype.maintenance_schedule.maintenance_schedule import (
+    materialize_maintenance_schedules,
+)
+from checktrack_connector.holiday_calendar import get_schedule_holiday_list
+from checktrack_connector.schedule_dates import DAYS_IN_PERIOD, get_visit_dates
+from checktrack_connector.utils import bulk_insert_docs, reserve_names
+
+AMC_NAMING_SERIES = "MAT-MSH-.YYYY.-"
+AMC_INSERT_CHUNK_SIZE = 200
+AMC_PREVIEW_ROWS = 50
+
+
+@frappe.whitelist()
+def generate_amc_schedules(
+    company,
+    periodicity,
+    start_date,
+    end_date=None,
+    no_of_visits=None,
+    customer=None,
+    item_code=None,
+    expiry_from=None,
+    expiry_to=None,
+    employee=None,
+    sales_person=None,
+    technicians=None,
+    submit=0,
+    dry_run=1,
+):
+    """
+    Maintenance Schedules for many Customer Items at once, selected by customer, item
+    code and/or AMC expiry window. With `dry_run` the selection and visit dates are
+    returned as a preview; otherwise the schedules are created in a background job and
+    the user is notified over realtime (`amc_schedules_ready`).
+
+    With `technicians` (list of Employees) every visit goes to the least-loaded one who
+    is not on holiday that day, otherwise all visits go to `employee`.
+    """
+    frappe.has_permission("Maintenance Schedule", "create", throw=True)
+    if periodicity not in DAYS_IN_PERIOD:
+        frappe.throw(_("Periodicity must be one of {0}").format(", ".join(DAYS_IN_PERIOD)))
+
+    options = dict(
+        company=company,
+        periodicity=periodicity,
+        start_date=start_date,
+        end_date=end_date,
+        no_of_visits=no_of_visits,
+        customer=customer,
+        item_code=item_code,
+        expiry_from=expiry_from,
+        expiry_to=expiry_to,
+        employee=employee,
+        sales_person=sales_person,
+        technicians=frappe.parse_json(technicians) if isinstance(technicians, str) else technicians,
+        submit=cint(submit),
+    )
+
+    if cint(dry_run):
+        return preview_amc_schedules(**options)
+
+    frappe.enqueue(build_amc_schedules, queue="long", timeout=3600, user=frappe.session.user, **options)
+    return {"status": "queued", "message": _("AMC schedules are being created. You will be notified when they are ready.")}
+
+
+def get_amc_items(customer=None, item_code=None, expiry_from=None, expiry_to=None):
+    """
+    Customer Items rows matching the filters, with their customer's contact fields. A
+    serial no listed more than once gives its row with the latest AMC expiry (rows
+    without one last, then the most recently modified).
+    """
+    items_table = frappe.qb.DocType("Customer Items Table")
+    items = frappe.qb.DocType("Customer Items")
+    customers = frappe.qb.DocType("Customer")
+    is_customer_item = (items_table.parenttype == "Customer") & (items_table.parentfield == "customer_items")
+
+    ranked = (
+        frappe.qb.from_(items_table)
+        .select(
+            items_table.name.as_("row_name"),
+            RowNumber()
+            .over(items_table.serial_no)
+            .orderby(items_table.amc_expiry_date, order=Order.desc)
+            .orderby(items_table.modified, order=Order.desc)
+            .orderby(items_table.name, order=Order.desc)
+            .as_("row_rank"),
+        )
+        .where(is_customer_item)
+    ).as_("ranked")
+
+    query = (
+        frappe.qb.from_(items_table)
+        .join(ranked)
+        .on((ranked.row_name == items_table.name) & (ranked.row_rank == 1))
+        .join(items)
+        .on(items.name == items_table.serial_no)
+        .join(customers)
+        .on(customers.name == items_table.parent)
+        .select(
+            items_table.parent.as_("customer"),
+            customers.customer_name,
+            customers.customer_email,
+            items_table.serial_no,
+            items_table.item_code,
+            items_table.item_name,
+            items_table.amc_expiry_date,
+        )
+        .where(is_customer_item)
+        .orderby(items_table.parent)
+        .orderby(items_table.serial_no)
+    )
+    if customer:
+        query = query.where(items_table.parent == customer)
+    if item_code:
+        query = query.where(items_table.item_code == item_code)
+    if expiry_from:
+        query = query.where(items_table.amc_expiry_date >= getdate(expiry_from))
+    if expiry_to:
+        query = query.where(items_table.amc_expiry_date <= getdate(expiry_to))
+
+    return query.run(as_dict=True)
+
+
+def get_amc_period(periodicity, start_date, end_date=None, no_of_visits=None):
+    """End date and visit count, completed from each other like `validate_end_date_visits`."""
+    days = DAYS_IN_PERIOD[periodicity]
+    start_date = getdate(start_date)
+    no_of_visits = cint(no_of_visits)
+
+    if not end_date:
+        end_date = add_days(start_date, (no_of_visits or 1) * days)
+    end_date = getdate(end_date)
+    if end_date <= start_date:
+        frappe.throw(_("Start date should be less than end date"))
+
+    if not no_of_visits:
+        no_of_visits = max(cint((date_diff(end_date, start_date) + 1) / days), 1)
+    return end_date, no_of_visits
+
+
+def get_amc_plan(
+    company, periodicity, start_date, end_date=None, no_of_visits=None, sales_person=None, technicians=None, **filters
+):
+    """Selected items, the visit dates shared by all of them (computed once) and the technicians' load."""
+    end_date, no_of_visits = get_amc_period(periodicity, start_date, end_date, no_of_visits)
+    holiday_list = get_schedule_holiday_list(sales_person, company)
+    visit_dates = get_visit_dates(start_date, end_date, no_of_visits, holiday_list)
+
+    return frappe._dict(
+        items=get_amc_items(**filters),
+        start_date=getdate(start_date),
+        end_date=end_date,
+        no_of_visits=no_of_visits,
+        visit_dates=visit_dates,
+        load_index=TechnicianLoadIndex(technicians, start_date, end_date) if technicians else None,
+    )
+
+
+def preview_amc_schedules(company, periodicity, start_date, employee=None, submit=0, **options):
+    plan = get_amc_plan(company, periodicity, start_date, **options)
+
+    # Visits per technician if the schedules were created now
+    assignments = {}
+    for _item in plan["items"]:
+        for visit_date in plan["visit_dates"]:
+            technician = get_visit_technician(plan, visit_date, employee)
+            assignments[technician] = assignments.get(technician, 0) + 1
+
+    return {
+        "schedules": len(plan["items"]),
+        "visits": len(plan["items"]) * len(plan["visit_dates"]),
+        "end_date": plan["end_date"],
+        "no_of_visits": plan["no_of_visits"],
+        "visit_dates": plan["visit_dates"],
+        "assignments": assignments,
+        "items": plan["items"][:AMC_PREVIEW_ROWS],
+    }
+
+
+def get_visit_technician(plan, visit_date, employee=None):
+    """Least-loaded available technician for the visit, else the schedule's employee."""
+    if plan["load_index"]:
+        return plan["load_index"].assign(visit_date) or employee
+    return employee
+
+
+def build_amc_schedules(user, company, periodicity, start_date, employee=None, sales_person=None, submit=0, **options):
+    """
+    Create one Maintenance Schedule per selected item with batched inserts. Submitted
+    schedules get their Tasks and Schedule Logs created right away and the items'
+    AMC reference and expiry written in one UPDATE.
+    """
+    frappe.set_user(user)
+    plan = get_amc_plan(company, periodicity, start_date, sales_person=sales_person, **options)
+    items = plan["items"]
+    if not items:
+        frappe.publish_realtime("amc_schedules_ready", {"schedules": []}, user=user)
+        return []
+
+    names = reserve_names(parse_naming_series(AMC_NAMING_SERIES), len(items))
+    docstatus = 1 if submit else 0
+    schedules = []
+    for item, name in zip(items, names, strict=True):
+        schedules.append(
+            make_amc_schedule(name, item, plan, company, periodicity, employee, sales_person, docstatus)
+        )
+
+    for start in range(0, len(schedules), AMC_INSERT_CHUNK_SIZE):
+        bulk_insert_docs(schedules[start : start + AMC_INSERT_CHUNK_SIZE])
+        publish_amc_progress(min(start + AMC_INSERT_CHUNK_SIZE, len(schedules)), len(schedules))
+
+    if submit:
+        update_items_amc({schedule.serial_no: schedule.name for schedule in schedules}, plan["end_date"])
+        materialize_maintenance_schedules(names)
+    else:
+        frappe.db.commit()
+
+    frappe.publish_realtime(
+        "amc_schedules_ready", {"schedules": names, "submitted": bool(submit)}, user=user
+    )
+    return names
+
+
+def make_amc_schedule(name, item, plan, company, periodicity, employee, sales_person, docstatus):
+    schedule = frappe.new_doc("Maintenance Schedule")
+    schedule.update({
+        "name": name,
+        "naming_series": AMC_NAMING_SERIES,
+        "transaction_date": nowdate(),
+        "status": "Submitted" if docstatus else "Draft",
+        "docstatus": docstatus,
+        "company": company,
+        "customer": item.customer,
+        "customer_name": item.customer_name,
+        "customer_email_id": item.customer_email,
+        "serial_no": item.serial_no,
+        "item_code": item.item_code,
+        "item_name": item.item_name,
+        "periodicity": periodicity,
+        "start_date": plan["start_date"],
+        "end_date": plan["end_date"],
+        "no_of_visits": plan["no_of_visits"],
+        "employee": employee,
+        "sales_person": sales_person,
+    })
+
+    for idx, visit_date in enumerate(plan["visit_dates"], 1):
+        schedule.append("schedules", {
+            "idx": idx,
+            "docstatus": docstatus,
+            "serial_no": item.serial_no,
+            "item_code": item.item_code,
+            "item_name": item.item_name,
+            "scheduled_date": visit_date,
+            "sales_person": sales_person,
+            "employee": get_visit_technician(plan, visit_date, employee),
+            "customer": item.customer,
+            "customer_name": item.customer_name,
+            "customer_email_id": item.customer_email,
+            "completion_status": "Pending",
+        })
+    return schedule
+
+
+def update_items_amc(schedule_by_serial, expiry_date):
+    """Point every item at its new schedule with one UPDATE per table."""
+    for doctype in ("Customer Items Table", "Customer Items"):
+        meta = frappe.get_meta(doctype)
+        if not (meta.has_field("amc") and meta.has_field("amc_expiry_date")):
+            continue
+
+        table = frappe.qb.DocType(doctype)
+        serial_no = table.name if doctype == "Customer Items" else table.serial_no
+        amc = Case()
+        for serial, schedule in schedule_by_serial.items():
+            amc = amc.when(serial_no == serial, schedule)
+
+        (
+            frappe.qb.update(table)
+            .set(table.amc, amc)
+            .set(table.amc_expiry_date, expiry_date)
+            .where(serial_no.isin(list(schedule_by_serial)))
+            .run()
+        )
+
+
+def publish_amc_progress(created, total):
+    frappe.publish_progress(
+        cint(created * 100 / total),
+        title=_("Creating AMC Schedules"),
+        description=_("{0} of {1} schedules created").format(created, total),
+    )
@@ -5,17 +5,24 @@ import requests
 import urllib.parse
 import json
 import math
+import hashlib
+from werkzeug.wrappers import Response
 from frappe.model.meta import get_meta
 from frappe.auth import LoginManager
 from frappe import _
 from frappe.utils.password import get_decrypted_password
 from frappe.utils.password import set_encrypted_password
 from checktrack_connector.onboard_api import automated_import_users, import_project
+from checktrack_connector.nestedset import deferred_nested_set
 from frappe.utils import get_url
 from datetime import datetime, timedelta
 from frappe.utils import random_string
 from frappe.utils import now_datetime, add_to_date
 from frappe.utils.data import get_datetime
+from frappe.utils import cint
+from frappe.query_builder import Criterion
+from frappe.model import default_fields, table_fields
+from collections import defaultdict
 
 # Replace with your actual JWT secret from Node.js app
 JWT_SECRET = conf.get("jwt_secret")
@@ -353,26 +360,28 @@ def create_all_team_members(team_members_data, company_name):
     rollback_results = []
 
     try:
-        for member_data in team_members_data:
-            try:
-                processing_count += 1
+        # Employee lft/rgt (reports_to tree) is rebuilt once after the loop
+        with deferred_nested_set("Employee"):
+            for member_data in team_members_data:
+                try:
+                    processing_count += 1
 
-                if "_id" in member_data and not "teammember_id" in member_data:
-                    member_data = map_team_member_data(member_data, company_name,False)
+                    if "_id" in member_data and not "teammember_id" in member_data:
+                        member_data = map_team_member_data(member_data, company_name,False)
 
-                result = create_team_member(member_data)
+                    result = create_team_member(member_data)
 
-                if result.get("already_exists"):
-                    already_existing_ids.append(result["data"]["name"])
-                else:
-                    successfully_processed_ids.append(result["data"]["name"])
+                    if result.get("already_exists"):
+                        already_existing_ids.append(result["data"]["name"])
+                    else:
+                        successfully_processed_ids.append(result["data"]["name"])
 
-            except Exception as e:
-                error_msg = str(e)
-                teammember_id = member_data.get('teammember_id', 'unknown')
-                should_rollback = True
-                rollback_reason = f"Error processing employee: {teammember_id} - {error_msg}"
-                break
+                except Exception as e:
+                    error_msg = str(e)
+                    teammember_id = member_data.get('teammember_id', 'unknown')
+                    should_rollback = True
+                    rollback_reason = f"Error processing employee: {teammember_id} - {error_msg}"
+                    break
 
         if should_rollback and successfully_processed_ids:
             rollback_results = rollback_team_members(successfully_processed_ids)
@@ -805,16 +814,50 @@ def get_decrypted_password_for_doc(docname):
         frappe.log_error(f"Error decrypting password for {docname}: {str(e)}", "CheckTrack Error")
         return {"error": "Could not decrypt password due to an internal error."}
 
+def make_etag(*parts):
+    """Build a strong ETag from the version parts of a response (timestamps, counts, params)."""
+    raw = json.dumps(parts, default=str, sort_keys=True)
+    return f'"{hashlib.sha1(raw.encode()).hexdigest()}"'
+
+def etag_matches(etag):
+    if_none_match = frappe.get_request_header("If-None-Match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    client_tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in client_tags
+
+def conditional_response(etag, build_payload):
+    """
+    Answer 304 Not Modified when the client already holds `etag`, otherwise build
+    the payload and return it with the ETag header. Outside of an HTTP request
+    (server-side calls, tests) the payload is returned as a plain dict.
+    """
+    if not getattr(frappe.local, "request", None):
+        return build_payload()
+
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(etag):
+        return Response(status=304, headers=headers)
+
+    return Response(
+        frappe.as_json({"message": build_payload()}),
+        status=200,
+        mimetype="application/json",
+        headers=headers,
+    )
+
 @frappe.whitelist()
 def get_tasks_for_user(assign_to=None, employee_id=None, extra_filters=None, page=None, page_size=None):
     page = int(page)
     page_size = int(page_size)
     start = (page - 1) * page_size
-    extra_filters = json.loads(extra_filters) if extra_filters else []
+    parsed_extra_filters = json.loads(extra_filters) if extra_filters else []
 
     def build_and_filters():
         filters = {}
-        for field, op, value in extra_filters:
+        for field, op, value in parsed_extra_filters:
             if op == "=":
                 filters[field] = value
             else:
@@ -832,60 +875,525 @@ def get_tasks_for_user(assign_to=None, employee_id=None, extra_filters=None, pag
     if employee_id:  # Only fetch unassigned tasks if employee_id exists
         or_filters.append({"assign_to": ["in", ["", None]]})
 
-    all_tasks = frappe.db.get_all(
+    filters = build_and_filters()
+
+    # Cheap version token: newest modified + row count of the visible set
+    version = frappe.db.get_all(
         "Task",
-        filters=build_and_filters(),
+        filters=filters,
         or_filters=or_filters,
-        fields=["*"],
-        start=start,
-        page_length=page_size,
-        order_by="due_date ASC, creation DESC"
+        fields=["max(modified) as last_modified", "count(name) as total"],
+    )[0]
+    etag = make_etag(
+        "get_tasks_for_user", frappe.session.user, assign_to, employee_id, extra_filters,
+        page, page_size, version.last_modified, version.total
+    )
+
+    def build_payload():
+        all_tasks = frappe.db.get_all(
+            "Task",
+            filters=filters,
+            or_filters=or_filters,
+            fields=["*"],
+            start=start,
+            page_length=page_size,
+            order_by="due_date ASC, creation DESC"
+        )
+
+        # Remove duplicates by task name (if needed)
+        task_map = {task["name"]: task for task in all_tasks}
+
+        return {"data": list(task_map.values())}
+
+    return conditional_response(etag, build_payload)
+
+@frappe.whitelist()
+def get_task_changes(cursor=None, assign_to=None, employee_id=None, limit=500):
+    """
+    Delta sync for the mobile app. Returns Tasks created or updated after `cursor`
+    plus tombstones for deleted Tasks, limited to the same visibility as
+    `get_tasks_for_user` (assignee, watcher, unassigned). `cursor` is the value
+    returned by the previous call; omit it for the initial sync. It tracks the last
+    Task change and, separately, the last deletion seen, so a tombstone is sent once.
+    """
+    limit = min(cint(limit) or 500, 1000)
+    cursor = frappe.parse_json(cursor) if cursor else {}
+    since = get_datetime(cursor.get("modified")) if cursor.get("modified") else None
+    since_name = cursor.get("name") or ""
+
+    task = frappe.qb.DocType("Task")
+    visibility = []
+    if assign_to:
+        visibility.append(task.assign_to == assign_to)
+    if employee_id:
+        visibility.append(task.watchers_id.like(f"%{employee_id}%"))
+        visibility.append(task.assign_to.isnull() | (task.assign_to == ""))
+
+    query = (
+        frappe.qb.from_(task)
+        .select(task.star)
+        .orderby(task.modified)
+        .orderby(task.name)
+        .limit(limit + 1)
     )
+    if visibility:
+        query = query.where(Criterion.any(visibility))
+    if since:
+        # (modified, name) keyset so rows sharing a timestamp are never skipped
+        query = query.where((task.modified > since) | ((task.modified == since) & (task.name > since_name)))
+
+    changed = query.run(as_dict=True)
+    has_more = len(changed) > limit
+    changed = changed[:limit]
+
+    if changed:
+        new_cursor = {"modified": str(changed[-1].modified), "name": changed[-1].name}
+    else:
+        new_cursor = {"modified": str(since) if since else None, "name": since_name}
+
+    # Deletions resume after the last tombstone seen; cursors without one (initial
+    # sync, older app versions) start from the Task cursor
+    deleted_since = cursor.get("deleted_at") or (str(since) if since else None)
+    deleted_name = cursor.get("deleted_name") or ""
+    deleted = []
+    if deleted_since:
+        deleted, last_deleted = get_task_tombstones(
+            get_datetime(deleted_since),
+            since_name=deleted_name,
+            until=get_datetime(new_cursor["modified"]) if has_more else None,
+            assign_to=assign_to,
+            employee_id=employee_id,
+        )
+        if last_deleted:
+            deleted_since, deleted_name = str(last_deleted.creation), last_deleted.name
+    else:
+        deleted_since = new_cursor["modified"]
+
+    new_cursor.update({"deleted_at": deleted_since, "deleted_name": deleted_name})
 
-    # Remove duplicates by task name (if needed)
-    task_map = {task["name"]: task for task in all_tasks}
+    return {
+        "data": changed,
+        "deleted": deleted,
+        "cursor": new_cursor,
+        "has_more": has_more,
+    }
 
-    return {"data": list(task_map.values())}
+def get_task_tombstones(since, since_name="", until=None, assign_to=None, employee_id=None):
+    """
+    Deleted Tasks (from Deleted Document) visible to the caller after the
+    (`since`, `since_name`) keyset, and the last Deleted Document read, visible or
+    not, to resume from.
+    """
+    deleted_document = frappe.qb.DocType("Deleted Document")
+    query = (
+        frappe.qb.from_(deleted_document)
+        .select(deleted_document.name, deleted_document.deleted_name, deleted_document.creation, deleted_document.data)
+        .where(deleted_document.deleted_doctype == "Task")
+        .where(
+            (deleted_document.creation > since)
+            | ((deleted_document.creation == since) & (deleted_document.name > since_name))
+        )
+        .orderby(deleted_document.creation)
+        .orderby(deleted_document.name)
+    )
+    if until:
+        query = query.where(deleted_document.creation <= until)
+    deleted_docs = query.run(as_dict=True)
+
+    tombstones = []
+    for deleted_doc in deleted_docs:
+        data = frappe.parse_json(deleted_doc.data) if deleted_doc.data else {}
+        task_assign_to = data.get("assign_to")
+        visible = not (assign_to or employee_id)
+        if assign_to and task_assign_to == assign_to:
+            visible = True
+        if employee_id and (employee_id in (data.get("watchers_id") or "") or not task_assign_to):
+            visible = True
+        if visible:
+            tombstones.append({"name": deleted_doc.deleted_name, "deleted_at": deleted_doc.creation})
+
+    return tombstones, deleted_docs[-1] if deleted_docs else None
 
 @frappe.whitelist()
 def get_expanded_doc(doctype, name):
-    doc = frappe.get_doc(doctype, name).as_dict()
     meta = get_meta(doctype)
 
-    def expand_field(field, value):
-        
-        if field.fieldtype == "Link" and value:
+    # Version token from the document and every dynamically linked document it expands
+    dynamic_fields = [f for f in meta.fields if f.fieldtype == "Dynamic Link"]
+    version_fields = ["modified"] + [f.fieldname for f in dynamic_fields] + [f.options for f in dynamic_fields]
+    version_row = frappe.db.get_value(doctype, name, list(dict.fromkeys(version_fields)), as_dict=True)
+    versions = []
+    if version_row:
+        versions.append(version_row.modified)
+        for f in dynamic_fields:
+            link_doctype, link_name = version_row.get(f.options), version_row.get(f.fieldname)
+            if link_doctype and link_name:
+                versions.append(frappe.db.get_value(link_doctype, link_name, "modified"))
+    etag = make_etag("get_expanded_doc", doctype, name, versions)
+
+    def build_payload():
+        doc = frappe.get_doc(doctype, name).as_dict()
+
+        def expand_field(field, value):
+
+            if field.fieldtype == "Link" and value:
+                return value
+
+            if field.fieldtype == "Dynamic Link" and value:
+                doctype_field = field.options
+                link_doctype = doc.get(doctype_field)
+                if link_doctype and value:
+                    try:
+                        return frappe.get_doc(link_doctype, value).as_dict()
+                    except:
+                        return value
+
+            if field.fieldtype in ("Table", "Table MultiSelect") and isinstance(value, list):
+                child_table = []
+                for row in value:
+                    row_meta = get_meta(field.options)
+                    expanded_row = row.copy()
+                    for child_field in row_meta.fields:
+                        val = row.get(child_field.fieldname)
+                        if child_field.fieldtype in ("Link", "Dynamic Link"):
+                            expanded_row[child_field.fieldname] = expand_field(child_field, val)
+                    child_table.append(expanded_row)
+                return child_table
+
             return value
 
-        if field.fieldtype == "Dynamic Link" and value:
-            doctype_field = field.options
-            link_doctype = doc.get(doctype_field)
-            if link_doctype and value:
-                try:
-                    return frappe.get_doc(link_doctype, value).as_dict()
-                except:
-                    return value
-
-        if field.fieldtype in ("Table", "Table MultiSelect") and isinstance(value, list):
-            child_table = []
-            for row in value:
-                row_meta = get_meta(field.options)
-                expanded_row = row.copy()
-                for child_field in row_meta.fields:
-                    val = row.get(child_field.fieldname)
-                    if child_field.fieldtype in ("Link", "Dynamic Link"):
-                        expanded_row[child_field.fieldname] = expand_field(child_field, val)
-                child_table.append(expanded_row)
-            return child_table
-
-        return value
-
-    expanded_doc = {}
-    for field in meta.fields:
-        val = doc.get(field.fieldname)
-        expanded_doc[field.fieldname] = expand_field(field, val)
+        expanded_doc = {}
+        for field in meta.fields:
+            val = doc.get(field.fieldname)
+            expanded_doc[field.fieldname] = expand_field(field, val)
+
+        return {"data": expanded_doc}
+
+    return conditional_response(etag, build_payload)
+
+@frappe.whitelist()
+def get_docs_batch(items):
+    """
+    Resolve several document reads in one round trip.
+
+    `items` is a list of {"doctype", "name", "fields", "labels"}; `fields` defaults to
+    every field (child tables included) and `labels` adds a fieldname -> label map.
+    Items sharing a doctype and field list are loaded with one permission-checked
+    query, and each requested child table with one more. Results come back in
+    request order; unreadable items carry an "error" instead of "data".
+    """
+    items = frappe.parse_json(items) or []
+
+    groups = {}
+    for idx, item in enumerate(items):
+        fields = tuple(item.get("fields") or ["*"])
+        groups.setdefault((item.get("doctype"), fields), []).append(idx)
+
+    results = [None] * len(items)
+    for (doctype, fields), indexes in groups.items():
+        names = list({items[idx].get("name") for idx in indexes})
+        try:
+            docs = load_docs_for_batch(doctype, names, list(fields))
+            labels = get_field_labels(doctype, fields) if any(items[idx].get("labels") for idx in indexes) else None
+        except Exception as e:
+            frappe.clear_last_message()
+            docs, labels = {}, None
+            error = str(e) or "Not permitted"
+        else:
+            error = "Not found or not permitted"
+
+        for idx in indexes:
+            name = items[idx].get("name")
+            result = {"doctype": doctype, "name": name}
+            if name in docs:
+                result["data"] = docs[name]
+                if items[idx].get("labels"):
+                    result["labels"] = labels
+            else:
+                result["error"] = error
+            results[idx] = result
+
+    return results
+
+def load_docs_for_batch(doctype, names, fields):
+    """Load `fields` of the named documents the session user can read, keyed by name."""
+    meta = frappe.get_meta(doctype)
+    all_fields = "*" in fields
+
+    child_tables = [
+        df for df in meta.get_table_fields()
+        if all_fields or df.fieldname in fields
+    ]
+    child_fieldnames = {df.fieldname for df in child_tables}
+    if all_fields:
+        columns = ["*"]
+    else:
+        columns = [
+            f for f in fields
+            if f not in child_fieldnames and (f in default_fields or meta.has_field(f))
+        ]
+        if "name" not in columns:
+            columns.append("name")
+
+    rows = frappe.get_list(doctype, filters={"name": ["in", names]}, fields=columns, limit_page_length=0)
+    docs = {row.name: row for row in rows}
+
+    for df in child_tables:
+        for row in docs.values():
+            row[df.fieldname] = []
+        if not docs:
+            continue
+        child_rows = frappe.get_all(
+            df.options,
+            filters={"parent": ["in", list(docs)], "parenttype": doctype, "parentfield": df.fieldname},
+            fields=["*"],
+            order_by="idx asc",
+        )
+        for child in child_rows:
+            docs[child.parent][df.fieldname].append(child)
+
+    return docs
+
+def get_field_labels(doctype, fields):
+    meta = frappe.get_meta(doctype)
+    if "*" in fields:
+        return {df.fieldname: df.label for df in meta.fields if df.fieldtype not in table_fields}
+    return {f: meta.get_label(f) for f in fields}
+
+# Report links on a task_type_doc (e.g. Preventive Maintenance Task) returned by get_task_detail
+TASK_DETAIL_REPORT_FIELDS = {
+    "service_report": "Service Report",
+    "pm_report": "Preventive Maintenance Report",
+    "calibration_certificate": "Calibration Report",
+    "feedback": "Feedback Form",
+}
+
+# Columns of each linked report shown on the task screen (no child tables)
+TASK_DETAIL_REPORT_COLUMNS = {
+    "Service Report": [
+        "name", "csr_no", "customer_name", "date", "status_of_call", "status_after_service",
+        "serial_no", "email_status", "modified",
+    ],
+    "Preventive Maintenance Report": [
+        "name", "csr_no", "customer_name", "date", "status_of_call", "status_after_service",
+        "serial_no", "email_status", "modified",
+    ],
+    "Calibration Report": [
+        "name", "customer_name", "instrument", "serial_no", "result", "date_of_calibration",
+        "due_date_of_calibration", "email_status", "modified",
+    ],
+    "Feedback Form": ["name", "rating", "feedback_details", "customer_remark", "modified"],
+}
+
+@frappe.whitelist()
+def get_task_detail(task):
+    """
+    Task screen aggregate: the Task, its Task Type status_flow / field_mapping, the
+    dynamic task_type_doc and a summary of any linked Service Report, Preventive
+    Maintenance Report, Calibration Report or Feedback Form, in one response. Cached
+    per user and keyed on the Task, Task Type and task_type_doc `modified` timestamps.
+    """
+    version_row = frappe.db.get_value("Task", task, ["modified", "type", "task_type_doc"], as_dict=True)
+    if not version_row:
+        frappe.throw(_("Task {0} not found").format(task), frappe.DoesNotExistError)
+
+    version = [
+        str(version_row.modified),
+        str(frappe.db.get_value("Task Type", version_row.type or "Task", "modified")),
+    ]
+    if version_row.type and version_row.task_type_doc:
+        version.append(str(frappe.db.get_value(version_row.type, version_row.task_type_doc, "modified")))
+
+    cache_key = f"task_detail:{task}"
+    cached = frappe.cache().hget(cache_key, frappe.session.user)
+    if cached and cached.get("version") == version:
+        return cached["payload"]
+
+    payload = build_task_detail(task)
+    frappe.cache().hset(cache_key, frappe.session.user, {"version": version, "payload": payload})
+    return payload
+
+def build_task_detail(task):
+    task_doc = load_docs_for_batch("Task", [task], ["*"]).get(task)
+    if not task_doc:
+        frappe.throw(_("Not permitted"), frappe.PermissionError)
+
+    task_type = task_doc.type or "Task"
+    task_type_doc = load_docs_for_batch("Task Type", [task_type], ["name", "status_flow", "field_mapping"]).get(task_type)
+
+    linked_doc = None
+    if task_doc.type and task_doc.task_type_doc:
+        linked_doc = load_docs_for_batch(task_doc.type, [task_doc.task_type_doc], ["*"]).get(task_doc.task_type_doc)
+
+    return {
+        "task": task_doc,
+        "status_flow": task_type_doc.status_flow if task_type_doc else [],
+        "field_mapping": task_type_doc.field_mapping if task_type_doc else [],
+        "task_type_doc": linked_doc,
+        "reports": load_task_detail_reports(linked_doc) if linked_doc else {},
+    }
+
+def load_task_detail_reports(linked_doc):
+    """
+    Linked reports keyed by link field: the names are grouped per report doctype and
+    each doctype is read once with its TASK_DETAIL_REPORT_COLUMNS only.
+    """
+    names_by_doctype = defaultdict(set)
+    for fieldname, report_doctype in TASK_DETAIL_REPORT_FIELDS.items():
+        if linked_doc.get(fieldname):
+            names_by_doctype[report_doctype].add(linked_doc.get(fieldname))
+
+    docs_by_doctype = {
+        report_doctype: load_docs_for_batch(report_doctype, list(names), TASK_DETAIL_REPORT_COLUMNS[report_doctype])
+        for report_doctype, names in names_by_doctype.items()
+    }
+
+    reports = {}
+    for fieldname, report_doctype in TASK_DETAIL_REPORT_FIELDS.items():
+        report_name = linked_doc.get(fieldname)
+        if report_name:
+            reports[fieldname] = docs_by_doctype[report_doctype].get(report_name)
+    return reports
+
+def clear_task_detail_cache(doc, method=None):
+    """
+    Drop cached task details affected by a changed or deleted report / feedback
+    document. Task Type changes need no clearing, its `modified` is part of the version.
+    """
+    task_names = set()
+    for fieldname, report_doctype in TASK_DETAIL_REPORT_FIELDS.items():
+        if doc.doctype != report_doctype:
+            continue
+        task_names.update(
+            frappe.get_all("Preventive Maintenance Task", filters={fieldname: doc.name}, pluck="task")
+        )
+
+    cache_keys = [f"task_detail:{task_name}" for task_name in filter(None, task_names)]
+    if cache_keys:
+        frappe.cache().delete_value(cache_keys)
+
+TASK_SUBTREE_CACHE_KEY = "task_subtree"
+TASK_SUBTREE_FIELDS = [
+    "name", "subject", "task_name", "parent_task", "is_group", "lft", "rgt",
+    "workflow_status", "progress", "expected_time", "actual_time",
+]
+
+@frappe.whitelist()
+def get_task_subtree(task):
+    """
+    A Task with all its descendants from one lft/rgt range query, ordered by lft. Every
+    node carries its depth and a rollup over its own subtree: task count, workflow
+    status counts, summed expected/actual time and progress averaged over leaf Tasks.
+
+    Rows are cached per subtree root and patched when a Task below it is saved.
+    """
+    frappe.has_permission("Task", "read", doc=task, throw=True)
+
+    rows = frappe.cache().hget(TASK_SUBTREE_CACHE_KEY, task)
+    if rows is None:
+        rows = load_task_subtree(task)
+        frappe.cache().hset(TASK_SUBTREE_CACHE_KEY, task, rows)
+
+    return {"root": task, "nodes": rollup_task_subtree(rows)}
+
+def load_task_subtree(task):
+    bounds = frappe.db.get_value("Task", task, ["lft", "rgt"], as_dict=True)
+    if not bounds:
+        frappe.throw(_("Task {0} not found").format(task), frappe.DoesNotExistError)
+
+    return frappe.get_all(
+        "Task",
+        filters={"lft": [">=", bounds.lft], "rgt": ["<=", bounds.rgt]},
+        fields=TASK_SUBTREE_FIELDS,
+        order_by="lft asc",
+    )
 
-    return {"data": expanded_doc}
+def rollup_task_subtree(rows):
+    """Depth on the way down (lft order), rollups in one reverse pass (children before parents)."""
+    nodes = []
+    by_name = {}
+    open_rgts = []
+    for row in rows:
+        while open_rgts and open_rgts[-1] < row.lft:
+            open_rgts.pop()
+        node = {field: row.get(field) for field in TASK_SUBTREE_FIELDS}
+        node["depth"] = len(open_rgts)
+        node["rollup"] = {
+            "task_count": 1,
+            "expected_time": row.expected_time or 0,
+            "actual_time": row.actual_time or 0,
+            "status_counts": {},
+        }
+        nodes.append(node)
+        by_name[row.name] = node
+        open_rgts.append(row.rgt)
+
+    # name -> [leaf count, progress summed over leaves] collected from children
+    leaves = {}
+    for node in reversed(nodes):
+        rollup = node["rollup"]
+        leaf_count, progress_sum = leaves.get(node["name"]) or (1, node["progress"] or 0)
+        rollup["progress"] = progress_sum / leaf_count
+        status = node["workflow_status"] or ""
+        rollup["status_counts"][status] = rollup["status_counts"].get(status, 0) + 1
+
+        parent = by_name.get(node["parent_task"])
+        if not parent:
+            continue
+
+        parent_leaves = leaves.setdefault(parent["name"], [0, 0])
+        parent_leaves[0] += leaf_count
+        parent_leaves[1] += progress_sum
+
+        parent_rollup = parent["rollup"]
+        parent_rollup["task_count"] += rollup["task_count"]
+        parent_rollup["expected_time"] += rollup["expected_time"]
+        parent_rollup["actual_time"] += rollup["actual_time"]
+        for status, count in rollup["status_counts"].items():
+            parent_rollup["status_counts"][status] = parent_rollup["status_counts"].get(status, 0) + count
+
+    return nodes
+
+def refresh_task_subtree_cache(doc, method=None):
+    """
+    Keep cached subtrees of the Task's ancestors current: field changes are patched into
+    the cached rows, inserts, moves and deletes drop the affected entries.
+    """
+    cache = frappe.cache()
+    if not doc.lft:
+        # Nested set update deferred, ancestors are unknown until the tree is rebuilt
+        cache.delete_value(TASK_SUBTREE_CACHE_KEY)
+        return
+
+    ancestors = frappe.get_all(
+        "Task", filters={"lft": ["<=", doc.lft], "rgt": [">=", doc.rgt]}, pluck="name"
+    )
+    before = doc.get_doc_before_save()
+    moved = not before or before.parent_task != doc.parent_task or method == "on_trash"
+
+    if moved:
+        old_parent = before and before.parent_task and frappe.db.get_value(
+            "Task", before.parent_task, ["lft", "rgt"], as_dict=True
+        )
+        if old_parent:
+            ancestors += frappe.get_all(
+                "Task",
+                filters={"lft": ["<=", old_parent.lft], "rgt": [">=", old_parent.rgt]},
+                pluck="name",
+            )
+        for name in set(ancestors):
+            cache.hdel(TASK_SUBTREE_CACHE_KEY, name)
+        return
+
+    for name in ancestors:
+        rows = cache.hget(TASK_SUBTREE_CACHE_KEY, name)
+        if rows is None:
+            continue
+        for row in rows:
+            if row.name == doc.name:
+                row.update({field: doc.get(field) for field in TASK_SUBTREE_FIELDS})
+                break
+        cache.hset(TASK_SUBTREE_CACHE_KEY, name, rows)
 
 @frappe.whitelist()
 def get_specific_doc_data(doctype, name=None, filters=None):
@@ -973,30 +1481,29 @@ def update_mongodb_tenant_flag(tenant_id, access_token):
 def update_related_tasks(doc, method):
     """
     This function is triggered when a Demo PM Task document is updated.
-    It looks up all Task documents that reference this Demo PM Task (via the dynamic Link field) 
+    It looks up all Task documents that reference this Demo PM Task (via the dynamic Link field)
     and updates their status to match the updated document.
-    """
-    # Check if the status field has changed. Optionally, you can compare with the previous value.
-    # For example, if you want to restrict updates only when status truly changes,
-    # you can use doc.get_doc_before_save() if available.
 
+    When the save was itself pushed from a Task (`flags.from_task_propagation` holds its
+    name), that Task is skipped, and Tasks are saved with `flags.from_linked_propagation`
+    so they don't push the status back to this document.
+    """
     # Fetch all Task documents where:
     # - the 'type' field equals the name of the Task_Type_Doc (e.g., "Demo PM Task")
     # - the 'task_type_doc' field equals the name of this document (doc.name)
-    tasks = frappe.get_all("Task",
-        filters={
-            "type": doc.doctype,
-            "task_type_doc": doc.name
-        },
-        fields=["name"]
-    )
+    # - the status differs, Tasks already in sync need no write
+    filters = {
+        "type": doc.doctype,
+        "task_type_doc": doc.name,
+        "workflow_status": ["!=", doc.workflow_status or ""],
+    }
+    if doc.flags.from_task_propagation:
+        filters["name"] = ["!=", doc.flags.from_task_propagation]
 
-    # Iterate through each task and update its status field
-    for task in tasks:
-        frappe.db.set_value("Task", task.name, "workflow_status", doc.workflow_status)
-        # Alternatively, if you want the document to be reloaded and triggers to fire, use:
-        task_doc = frappe.get_doc("Task", task.name)
+    for task in frappe.get_all("Task", filters=filters, pluck="name"):
+        task_doc = frappe.get_doc("Task", task)
         task_doc.workflow_status = doc.workflow_status
+        task_doc.flags.from_linked_propagation = True
         task_doc.save()
 
 @frappe.whitelist(allow_guest=True)
@@ -1095,22 +1602,35 @@ def get_task_and_service_report(task_id):
     if not task_id:
         return {"error": "Missing task_id"}
 
-    task = frappe.get_doc("Preventive Maintenance Task", task_id)
-
-    # optionally restrict which fields you expose
-    result = {
-        "task": {
-            "name": task.name,
-            "service_report": task.service_report,
-            "feedback": task.feedback
+    version_row = frappe.db.get_value(
+        "Preventive Maintenance Task", task_id, ["modified", "service_report"], as_dict=True
+    )
+    versions = []
+    if version_row:
+        versions.append(version_row.modified)
+        if version_row.service_report:
+            versions.append(frappe.db.get_value("Service Report", version_row.service_report, "modified"))
+    etag = make_etag("get_task_and_service_report", task_id, versions)
+
+    def build_payload():
+        task = frappe.get_doc("Preventive Maintenance Task", task_id)
+
+        # optionally restrict which fields you expose
+        result = {
+            "task": {
+                "name": task.name,
+                "service_report": task.service_report,
+                "feedback": task.feedback
+            }
         }
-    }
 
-    if task.service_report:
-        report = frappe.get_doc("Service Report", task.service_report)
-        result["service_report"] = {
-            "name": report.name,
-            "remarks": report.remarks
-        }
+        if task.service_report:
+            report = frappe.get_doc("Service Report", task.service_report)
+            result["service_report"] = {
+                "name": report.name,
+                "remarks": report.remarks
+            }
+
+        return result
 
-    return result
\ No newline at end of file
+    return conditional_response(etag, build_payload)
@@ -0,0 +1,93 @@
+import heapq
+from collections import defaultdict
+
+import frappe
+from frappe.query_builder.functions import Count
+from frappe.utils import getdate
+
+from checktrack_connector.holiday_calendar import get_holiday_ordinals
+
+
+class TechnicianLoadIndex:
+    """
+    Per-employee, per-day visit load of a set of technicians, built from their open Tasks
+    (`assign_to`, `due_date`) and holiday lists.
+
+    `assign(date)` places a visit on the least-loaded technician who is not on holiday
+    that day. Every day keeps a min-heap of (load, employee) that is built on first use
+    and updated lazily: stale entries are dropped when they reach the top, so each
+    assignment is O(log n) in the number of technicians.
+    """
+
+    def __init__(self, employees, from_date=None, to_date=None):
+        self.employees = list(dict.fromkeys(filter(None, employees)))
+        self.eligible = set(self.employees)
+        self.load = defaultdict(int)  # (employee, ordinal) -> open visits
+        self.heaps = {}
+        self.holidays = {}
+
+        if self.employees:
+            self.load_open_tasks(from_date, to_date)
+            self.load_holidays()
+
+    def load_open_tasks(self, from_date=None, to_date=None):
+        task = frappe.qb.DocType("Task")
+        query = (
+            frappe.qb.from_(task)
+            .select(task.assign_to, task.due_date, Count("*"))
+            .where(task.assign_to.isin(self.employees) & task.due_date.isnotnull() & (task.docstatus == 0))
+            .groupby(task.assign_to, task.due_date)
+        )
+        if from_date:
+            query = query.where(task.due_date >= getdate(from_date))
+        if to_date:
+            query = query.where(task.due_date <= getdate(to_date))
+
+        for employee, due_date, count in query.run():
+            self.load[(employee, getdate(due_date).toordinal())] += count
+
+    def load_holidays(self):
+        rows = frappe.get_all(
+            "Employee",
+            filters={"name": ["in", self.employees]},
+            fields=["name", "holiday_list", "company"],
+        )
+        for row in rows:
+            holiday_list = row.holiday_list or frappe.get_cached_value("Company", row.company, "default_holiday_list")
+            self.holidays[row.name] = set(get_holiday_ordinals(holiday_list))
+
+    def get_heap(self, ordinal):
+        heap = self.heaps.get(ordinal)
+        if heap is None:
+            heap = [
+                (self.load[(employee, ordinal)], employee)
+                for employee in self.employees
+                if ordinal not in self.holidays.get(employee, ())
+            ]
+            heapq.heapify(heap)
+            self.heaps[ordinal] = heap
+        return heap
+
+    def least_loaded(self, date):
+        """Least-loaded technician available on `date`, or None if all of them are off."""
+        ordinal = getdate(date).toordinal()
+        heap = self.get_heap(ordinal)
+        while heap:
+            load, employee = heap[0]
+            if load == self.load[(employee, ordinal)]:
+                return employee
+            heapq.heappop(heap)  # stale, a newer entry for this employee is in the heap
+
+    def add(self, employee, date):
+        """Record a visit on `date` for `employee`."""
+        ordinal = getdate(date).toordinal()
+        self.load[(employee, ordinal)] += 1
+        if ordinal in self.heaps and employee in self.eligible and ordinal not in self.holidays.get(employee, ()):
+            heapq.heappush(self.heaps[ordinal], (self.load[(employee, ordinal)], employee))
+
+    def assign(self, date):
+        """Place a visit on the least-loaded available technician and return them."""
+        employee = self.least_loaded(date)
+        if employee:
+            self.add(employee, date)
+        return employee
@@ -6,6 +6,9 @@ from frappe.model.document import Document
 from frappe.model.naming import set_name_by_naming_series
 from frappe.utils import nowdate
 
+from checktrack_connector.hook.address_hooks import get_formatted_address
+from checktrack_connector.utils import bulk_insert_docs
+
 
 class Customer(Document):
 	def autoname(self):
@@ -17,36 +20,42 @@ class Customer(Document):
 
 		# Populate primary_address from linked Address doctype
 		if self.customer_primary_address:
-			address_doc = frappe.get_doc("Address", self.customer_primary_address)
-			address_parts = []
-
-			if address_doc.address_line1:
-				address_parts.append(address_doc.address_line1.strip())
-			if address_doc.address_line2:
-				address_parts.append(address_doc.address_line2.strip())
-			if address_doc.city:
-				address_parts.append(address_doc.city.strip())
-			if address_doc.state:
-				address_parts.append(address_doc.state.strip())
-			if address_doc.pincode:
-				address_parts.append(address_doc.pincode.strip())
-			if address_doc.country:
-				address_parts.append(address_doc.country.strip())
-
-			self.primary_address = ", ".join(address_parts)
-
-
-		# Your existing logic for customer_items
+			self.primary_address = get_formatted_address(self.customer_primary_address)
+
+		if self.has_customer_items_changed():
+			self.create_customer_items()
+
+	def has_customer_items_changed(self):
+		before = self.get_doc_before_save()
+		if not before:
+			return True
+		return get_serial_nos(before) != get_serial_nos(self)
+
+	def create_customer_items(self):
+		"""Create a Customer Items record for every serial no not registered yet, in one batch."""
+		serial_nos = get_serial_nos(self)
+		if not serial_nos:
+			return
+
+		existing = set(frappe.get_all("Customer Items", filters={"serial_no": ["in", serial_nos]}, pluck="serial_no"))
+		new_items = []
 		for item in self.customer_items:
-			if not frappe.db.exists("Customer Items", {"serial_no": item.serial_no}):
-				customer_items = frappe.new_doc("Customer Items")
-				customer_items.serial_no = item.serial_no
-				customer_items.item_code = item.item_code
-				customer_items.item_name = item.item_name
-				customer_items.amc = item.amc
-				customer_items.customer = self.name
-				customer_items.insert(ignore_permissions=True)
-				frappe.logger().info(f"Customer Items created for Serial No: {item.serial_no}, Customer: {self.name}")
-			else:
-				frappe.logger().info(f"Customer Items already exists for Serial No: {item.serial_no}, skipping creation.")
+			if not item.serial_no or item.serial_no in existing:
+				continue
+			existing.add(item.serial_no)
+
+			customer_items = frappe.new_doc("Customer Items")
+			customer_items.serial_no = item.serial_no
+			customer_items.item_code = item.item_code
+			customer_items.item_name = item.item_name
+			customer_items.amc = item.amc
+			customer_items.customer = self.name
+			new_items.append(customer_items)
+
+		if new_items:
+			bulk_insert_docs(new_items)
+			frappe.logger().info(f"{len(new_items)} Customer Items created for Customer: {self.name}")
+
 
+def get_serial_nos(customer):
+	return list(dict.fromkeys(item.serial_no for item in customer.customer_items if item.serial_no))
@@ -1,7 +1,7 @@
 # Copyright (c) 2025, satat tech llp and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests import IntegrationTestCase, UnitTestCase
 
 
@@ -27,4 +27,30 @@ class IntegrationTestCustomer(IntegrationTestCase):
 	Use this class for testing interactions between multiple components.
 	"""
 
-	pass
+	def test_customer_items_created_in_bulk(self):
+		frappe.get_doc({"doctype": "Customer Items", "serial_no": "_T-SN-000"}).insert()
+
+		customer = frappe.get_doc({
+			"doctype": "Customer",
+			"naming_series": "CUST-.YYYY.-",
+			"customer_name": "_Test Customer Items",
+			"customer_type": "Company",
+			"customer_email": "customer-items@example.com",
+			"customer_phone": "9876543210",
+			"customer_items": [{"serial_no": f"_T-SN-{i:03d}", "item_name": "Meter"} for i in range(20)],
+		}).insert()
+
+		serial_nos = frappe.get_all("Customer Items", filters={"customer": customer.name}, pluck="serial_no")
+		self.assertEqual(len(serial_nos), 19)
+		self.assertNotIn("_T-SN-000", serial_nos)
+
+		# Unchanged instruments are not looked up again on save
+		frappe.delete_doc("Customer Items", "_T-SN-001")
+		customer.customer_phone = "9876543211"
+		customer.save()
+		self.assertFalse(frappe.db.exists("Customer Items", "_T-SN-001"))
+
+		customer.append("customer_items", {"serial_no": "_T-SN-020", "item_name": "Meter"})
+		customer.save()
+		self.assertTrue(frappe.db.exists("Customer Items", "_T-SN-001"))
+		self.assertTrue(frappe.db.exists("Customer Items", "_T-SN-020"))
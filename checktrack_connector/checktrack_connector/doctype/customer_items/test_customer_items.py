@@ -1,9 +1,18 @@
 # Copyright (c) 2025, satat tech llp and Contributors
 # See license.txt
 
-# import frappe
+import csv
+import os
+import tempfile
+from unittest.mock import patch
+
+import frappe
 from frappe.tests import IntegrationTestCase, UnitTestCase
 
+from checktrack_connector.amc import get_amc_items
+from checktrack_connector.instrument_import import import_customer_items, import_instruments
+from checktrack_connector.utils import get_private_file_path
+
 
 # On IntegrationTestCase, the doctype test records and all
 # link-field test record dependencies are recursively loaded
@@ -27,4 +36,69 @@ class IntegrationTestCustomerItems(IntegrationTestCase):
 	Use this class for testing interactions between multiple components.
 	"""
 
-	pass
+	# Chunks are committed by the import, keep them in the test transaction
+	@patch("frappe.db.commit", new=lambda *args, **kwargs: None)
+	def test_instrument_import(self):
+		customer = frappe.get_doc({
+			"doctype": "Customer",
+			"naming_series": "CUST-.YYYY.-",
+			"customer_name": "_Test Instrument Import",
+			"customer_type": "Company",
+			"customer_email": "instrument-import@example.com",
+			"customer_phone": "9876543210",
+		}).insert()
+		prefix = frappe.generate_hash(length=6)
+		frappe.get_doc({"doctype": "Customer Items", "serial_no": f"{prefix}-0", "customer": customer.name}).insert()
+
+		rows = [["Serial No", "Customer", "Item Name"]]
+		rows += [[f"{prefix}-{i}", customer.name, "Meter"] for i in range(5)]
+		rows += [[f"{prefix}-1", customer.name, "Meter"], [f"{prefix}-9", "_Unknown Customer", "Meter"], ["", customer.name, ""]]
+
+		with tempfile.NamedTemporaryFile("w", suffix=".csv", newline="", delete=False) as f:
+			csv.writer(f).writerows(rows)
+		self.addCleanup(os.remove, f.name)
+
+		summary = import_instruments(f.name, chunk_size=2)
+		self.addCleanup(os.remove, get_private_file_path(os.path.basename(summary.conflicts_file)))
+		self.assertEqual(summary.rows, 8)
+		self.assertEqual(summary.inserted, 4)
+		self.assertEqual(summary.conflict_count, 4)
+		self.assertEqual([conflict["row"] for conflict in summary.conflicts], [2, 7, 8, 9])
+
+		customer.reload()
+		self.assertEqual([row.serial_no for row in customer.customer_items], [f"{prefix}-{i}" for i in range(1, 5)])
+		self.assertEqual([row.idx for row in customer.customer_items], [1, 2, 3, 4])
+
+	def test_import_needs_read_access_to_the_file(self):
+		file_doc = frappe.get_doc({
+			"doctype": "File",
+			"file_name": f"_test-instruments-{frappe.generate_hash(length=6)}.csv",
+			"is_private": 1,
+			"content": "Serial No,Customer\n",
+		}).insert(ignore_permissions=True)
+		self.addCleanup(frappe.set_user, "Administrator")
+
+		# Allowed to import, but not to read someone else's private file
+		frappe.set_user("Guest")
+		with patch("frappe.has_permission", return_value=True):
+			self.assertRaises(frappe.PermissionError, import_customer_items, file_doc.file_url)
+
+	def test_amc_items_use_latest_expiry(self):
+		serial_no = f"_Test AMC {frappe.generate_hash(length=6)}"
+		customer = frappe.get_doc({
+			"doctype": "Customer",
+			"naming_series": "CUST-.YYYY.-",
+			"customer_name": "_Test AMC Items",
+			"customer_type": "Company",
+			"customer_email": "amc-items@example.com",
+			"customer_phone": "9876543210",
+			"customer_items": [
+				{"serial_no": serial_no, "item_name": "Meter", "amc_expiry_date": "2026-03-31"},
+				{"serial_no": serial_no, "item_name": "Meter", "amc_expiry_date": "2027-03-31"},
+				{"serial_no": serial_no, "item_name": "Meter"},
+			],
+		}).insert()
+
+		items = get_amc_items(customer=customer.name)
+		self.assertEqual(len(items), 1)
+		self.assertEqual(str(items[0].amc_expiry_date), "2027-03-31")
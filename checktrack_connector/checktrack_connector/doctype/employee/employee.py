@@ -1,10 +1,12 @@
 # Copyright (c) 2025, satat tech llp and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.utils.nestedset import NestedSet
 from frappe.model.document import Document
 
+from checktrack_connector.nestedset import update_nested_set
+
 class Employee(Document):
     def before_insert(self):
         self.set_full_name()
@@ -12,7 +14,14 @@ class Employee(Document):
     def before_save(self):
         self.set_full_name()
 
+    def on_update(self):
+        update_nested_set(self)
+
     def set_full_name(self):
         first_name = self.first_name or ''
         last_name = self.last_name or ''
         self.employee_name = f"{first_name} {last_name}".strip()
+
+
+def on_doctype_update():
+    frappe.db.add_index("Employee", ["lft", "rgt"])
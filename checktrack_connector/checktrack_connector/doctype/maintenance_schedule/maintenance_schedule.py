@@ -4,11 +4,22 @@
 
 import frappe
 from frappe import _, throw
+from frappe.model.naming import set_new_name
 from frappe.utils import add_days, cint, cstr, date_diff, formatdate, getdate
 
-from erpnext.setup.doctype.employee.employee import get_holiday_list_for_employee
 from erpnext.utilities.transaction_base import TransactionBase, delete_events
 
+from checktrack_connector.assignment import TechnicianLoadIndex
+from checktrack_connector.checktrack_connector.doctype.task.task import update_task_derived_fields
+from checktrack_connector.checktrack_connector.doctype.task_type.task_type import get_task_type_config
+from checktrack_connector.holiday_calendar import get_schedule_holiday_list, previous_working_day
+from checktrack_connector.nestedset import rebuild_nested_set
+from checktrack_connector.schedule_dates import DAYS_IN_PERIOD, get_visit_dates
+from checktrack_connector.utils import bulk_append_child_rows, bulk_insert_docs, reserve_names
+
+# Visits whose PM Task and Task are inserted per multi-row INSERT
+MATERIALIZE_CHUNK_SIZE = 500
+
 
 class MaintenanceSchedule(TransactionBase):
 	# begin: auto-generated types
@@ -23,6 +34,10 @@ class MaintenanceSchedule(TransactionBase):
 			MaintenanceScheduleDetail,
 		)
 
+		from checktrack_connector.checktrack_connector.doctype.maintenance_schedule_technician.maintenance_schedule_technician import (
+			MaintenanceScheduleTechnician,
+		)
+
 		address_display: DF.TextEditor | None
 		amended_from: DF.Link | None
 		company: DF.Link
@@ -40,7 +55,10 @@ class MaintenanceSchedule(TransactionBase):
 		customer_name: DF.Data | None
 		customer_email_id: DF.Data | None
 		naming_series: DF.Literal["MAT-MSH-.YYYY.-"]
+		materialization_error: DF.SmallText | None
+		materialization_status: DF.Literal["", "Queued", "Completed", "Failed"]
 		schedules: DF.Table[MaintenanceScheduleDetail]
+		technicians: DF.TableMultiSelect[MaintenanceScheduleTechnician]
 		status: DF.Literal["", "Draft", "Submitted", "Cancelled"]
 		territory: DF.Link | None
 		transaction_date: DF.Date
@@ -56,6 +74,7 @@ class MaintenanceSchedule(TransactionBase):
 		self.validate_maintenance_detail()
 		
 		s_list = self.create_schedule_list(self.start_date, self.end_date, self.no_of_visits, self.sales_person)
+		employees = self.get_visit_technicians(s_list)
 		
 		for i in range(self.no_of_visits):
 			child = self.append("schedules")
@@ -65,7 +84,7 @@ class MaintenanceSchedule(TransactionBase):
 			child.scheduled_date = s_list[i].strftime("%Y-%m-%d")
 			child.idx = i + 1
 			child.sales_person = self.sales_person
-			child.employee = self.employee
+			child.employee = employees[i]
 			child.customer = self.customer
 			child.customer_name = self.customer_name
 			child.customer_email_id = self.customer_email_id
@@ -73,8 +92,8 @@ class MaintenanceSchedule(TransactionBase):
 
 	@frappe.whitelist()
 	def validate_end_date_visits(self):
-		days_in_period = {"Weekly": 7, "Monthly": 30, "Quarterly": 91, "Half Yearly": 182, "Yearly": 365}
-		
+		days_in_period = DAYS_IN_PERIOD
+
 		if self.periodicity and self.periodicity != "Random" and self.start_date:
 			if not self.end_date:
 				if self.no_of_visits:
@@ -133,83 +152,60 @@ class MaintenanceSchedule(TransactionBase):
 				customer_items.save()
 				frappe.msgprint(f"Updated AMC and AMC expiry for {customer_items.serial_no}")
 
-		for entry in self.schedules:
-			# Create a new Preventive Maintenance Task record
-			pm_task = frappe.new_doc("Preventive Maintenance Task")
-			pm_task.customer = entry.customer
-			pm_task.item = entry.serial_no
-			pm_task.insert()
-
-			# Get the User linked to the Employee (if needed)
-			# Skip this if 'assigned_to' links to Employee directly
-			user_id = frappe.db.get_value("Employee", entry.employee, "name")
-			if not user_id:
-				frappe.throw(f"No User found for Employee {entry.employee}")
+		# Assigned employees are checked here so a bad row still fails the submit
+		employees = {entry.employee for entry in self.schedules}
+		existing = set(frappe.get_all("Employee", filters={"name": ["in", list(employees)]}, pluck="name"))
+		for employee in employees - existing:
+			frappe.throw(f"No User found for Employee {employee}")
 
-			# Create a new Task
-			task = frappe.new_doc("Task")
-			task.task_name = f"Preventive Maintenance - {entry.scheduled_date}"
-			task.due_date = entry.scheduled_date
-			task.assign_to = user_id  # or entry.employee if linked directly
-			task.type = "Preventive Maintenance Task"
-			task.task_type_doc = pm_task.name
-			task.insert()
+		# PM Tasks, Tasks and Schedule Logs are created in the background
+		self.enqueue_materialization()
+		frappe.msgprint(_("Tasks for {0} visits are being created in the background").format(len(self.schedules)))
 
 		self.db_set("status", "Submitted")
 
-	def create_schedule_list(self, start_date, end_date, no_of_visit, sales_person):
-		schedule_list = []
-		start_date_copy = start_date
-		date_diff = (getdate(end_date) - getdate(start_date)).days
-		add_by = date_diff / no_of_visit
-
-		for _visit in range(cint(no_of_visit)):
-			if getdate(start_date_copy) < getdate(end_date):
-				start_date_copy = add_days(start_date_copy, add_by)
-				if len(schedule_list) < no_of_visit:
-					schedule_date = self.validate_schedule_date_for_holiday_list(
-						getdate(start_date_copy), sales_person
-					)
-					if schedule_date > getdate(end_date):
-						schedule_date = getdate(end_date)
-					schedule_list.append(schedule_date)
-
-		return schedule_list
+	def enqueue_materialization(self):
+		self.db_set({"materialization_status": "Queued", "materialization_error": None}, update_modified=False)
+		frappe.enqueue(
+			materialize_maintenance_schedule,
+			queue="long",
+			timeout=3600,
+			job_id=f"materialize_maintenance_schedule::{self.name}",
+			deduplicate=True,
+			enqueue_after_commit=True,
+			schedule=self.name,
+		)
 
-	def validate_schedule_date_for_holiday_list(self, schedule_date, sales_person):
-		validated = False
+	@frappe.whitelist()
+	def retry_materialization(self):
+		"""Create the visit Tasks again after a failed background run."""
+		self.check_permission("submit")
+		if self.docstatus != 1 or self.materialization_status != "Failed":
+			frappe.throw(_("Tasks can only be recreated for a submitted schedule whose task creation failed"))
+		self.enqueue_materialization()
 
-		employee = frappe.db.get_value("Sales Person", sales_person, "employee")
-		if employee:
-			holiday_list = get_holiday_list_for_employee(employee)
-		else:
-			holiday_list = frappe.get_cached_value("Company", self.company, "default_holiday_list")
+	def create_schedule_list(self, start_date, end_date, no_of_visit, sales_person):
+		# Holiday list resolved once, dates computed in one pass from the cached calendar
+		holiday_list = get_schedule_holiday_list(sales_person, self.company)
+		return get_visit_dates(start_date, end_date, no_of_visit, holiday_list)
 
-		holidays = frappe.db.sql_list(
-			"""select holiday_date from `tabHoliday` where parent=%s""", holiday_list
-		)
+	def get_visit_technicians(self, visit_dates):
+		"""Employee per visit: the least-loaded available technician, else the schedule's employee."""
+		technicians = [row.employee for row in self.get("technicians") or []]
+		if not technicians:
+			return [self.employee] * len(visit_dates)
 
-		if not validated and holidays:
-			# max iterations = len(holidays)
-			for _i in range(len(holidays)):
-				if schedule_date in holidays:
-					schedule_date = add_days(schedule_date, -1)
-				else:
-					validated = True
-					break
+		index = TechnicianLoadIndex(technicians, self.start_date, self.end_date)
+		return [index.assign(visit_date) or self.employee for visit_date in visit_dates]
 
-		return schedule_date
+	def validate_schedule_date_for_holiday_list(self, schedule_date, sales_person):
+		holiday_list = get_schedule_holiday_list(sales_person, self.company)
+		return previous_working_day(holiday_list, schedule_date)
 
 	def validate_dates_with_periodicity(self):
 		if self.start_date and self.end_date and self.periodicity and self.periodicity != "Random":
 			date_diff = (getdate(self.end_date) - getdate(self.start_date)).days + 1
-			days_in_period = {
-				"Weekly": 7,
-				"Monthly": 30,
-				"Quarterly": 90,
-				"Half Yearly": 180,
-				"Yearly": 365,
-			}
+			days_in_period = DAYS_IN_PERIOD
 
 			if date_diff < days_in_period[self.periodicity]:
 				throw(
@@ -297,11 +293,132 @@ class MaintenanceSchedule(TransactionBase):
 					return schedule.name
 
 
-def create_schedule_logs(doc, method):
-	for row in doc.schedules:
-		frappe.msgprint(f"Creating log for Item Code: {row.item_code}")
-		
+def materialize_maintenance_schedule(schedule, chunk_size=MATERIALIZE_CHUNK_SIZE):
+	materialize_maintenance_schedules([schedule], chunk_size)
+
+
+def materialize_maintenance_schedules(schedules, chunk_size=MATERIALIZE_CHUNK_SIZE):
+	"""
+	Create the Preventive Maintenance Task and Task of every visit with multi-row inserts,
+	then the Schedule Logs, and hand all new Tasks to one batched Mongo sync.
+
+	Runs in one transaction. Task hooks are skipped, so derived fields, the linked PM Task
+	back-reference and the new Tasks' nested set are filled in here, once for all schedules.
+	Schedules already materialized are skipped, so the job can be re-run. On failure
+	everything since the savepoint is undone, the schedules are marked Failed and the user
+	is notified.
+	"""
+	pending = set(
+		frappe.get_all(
+			"Maintenance Schedule",
+			filters={"name": ["in", schedules], "materialization_status": ["!=", "Completed"]},
+			pluck="name",
+		)
+	)
+	schedules = [schedule for schedule in schedules if schedule in pending]
+	if not schedules:
+		return []
+
+	frappe.db.savepoint("materialize_maintenance_schedules")
+	try:
+		config = get_task_type_config("Preventive Maintenance Task")
+		task_names = []
+		for schedule in schedules:
+			doc = frappe.get_doc("Maintenance Schedule", schedule)
+			task_names.extend(create_visit_tasks(doc, config, chunk_size))
+			create_schedule_logs(doc)
+
+		# New Tasks are top-level, only their own ranges are placed
+		rebuild_nested_set("Task", task_names)
+		set_materialization_status(schedules, "Completed")
+		frappe.db.commit()
+	except Exception as e:
+		frappe.db.rollback(save_point="materialize_maintenance_schedules")
+		frappe.log_error(title="Maintenance Schedule Task Creation Failed", reference_doctype="Maintenance Schedule")
+		set_materialization_status(schedules, "Failed", str(e))
+		frappe.db.commit()
+		frappe.publish_realtime(
+			"maintenance_schedule_failed",
+			{"schedules": schedules, "error": str(e)},
+			user=frappe.session.user,
+		)
+		return []
+
+	frappe.enqueue("checktrack_connector.sync.sync_tasks_to_mongo", queue="long", timeout=3600, task_names=task_names)
+	return task_names
+
+
+def set_materialization_status(schedules, status, error=None):
+	schedule = frappe.qb.DocType("Maintenance Schedule")
+	(
+		frappe.qb.update(schedule)
+		.set(schedule.materialization_status, status)
+		.set(schedule.materialization_error, error)
+		.where(schedule.name.isin(schedules))
+		.run()
+	)
+
+
+def create_visit_tasks(doc, config, chunk_size=MATERIALIZE_CHUNK_SIZE):
+	task_type = "Preventive Maintenance Task"
+	total = len(doc.schedules)
+	task_names = []
+
+	for start in range(0, total, chunk_size):
+		pm_tasks, tasks = [], []
+		for entry in doc.schedules[start : start + chunk_size]:
+			pm_task = frappe.new_doc(task_type)
+			pm_task.customer = entry.customer
+			pm_task.item = entry.serial_no
+			set_new_name(pm_task)
+
+			task = frappe.new_doc("Task")
+			task.task_name = f"Preventive Maintenance - {entry.scheduled_date}"
+			task.due_date = entry.scheduled_date
+			task.assign_to = entry.employee
+			task.type = task_type
+			task.task_type_doc = pm_task.name
+			task.watchers_id = ""
+			set_new_name(task)
+
+			pm_task.task = task.name
+			pm_task.workflow_status = task.workflow_status
+			pm_tasks.append(pm_task)
+			tasks.append(task)
+
+		bulk_insert_docs(pm_tasks)
+		chunk_names = bulk_insert_docs(tasks)
+		if config:
+			update_task_derived_fields(chunk_names, config)
+		task_names.extend(chunk_names)
+
+		frappe.publish_progress(
+			cint(len(task_names) * 100 / total),
+			title=_("Creating Tasks"),
+			doctype=doc.doctype,
+			docname=doc.name,
+			description=_("{0} of {1} tasks created").format(len(task_names), total),
+		)
+
+	return task_names
+
+
+def create_schedule_logs(doc, method=None):
+	"""
+	Schedule Log per visit and an Employee Task Details row for the assigned technician,
+	written with multi-row INSERTs: Employees are resolved in one query and each
+	technician's rows are appended in one go instead of one Employee save per visit.
+	"""
+	rows = doc.schedules
+	if not rows:
+		return
+
+	# format:{scheduled_date}-{####} numbers on the "" series, reserved for all rows at once
+	numbers = reserve_names("", len(rows), 4)
+	logs = []
+	for row, number in zip(rows, numbers, strict=True):
 		log = frappe.new_doc("Schedule Log")
+		log.name = f"{row.scheduled_date}-{number}"
 		log.serial_no = row.serial_no
 		log.item_code = row.item_code
 		log.item_name = row.item_name
@@ -313,34 +430,45 @@ def create_schedule_logs(doc, method):
 		log.customer_name = row.customer_name
 		log.customer_email_id = row.customer_email_id
 		log.maintenance_schedule = doc.name
-		log.insert()
+		logs.append(log)
+	bulk_insert_docs(logs)
 
+	rows_by_member = {}
+	for row in rows:
 		if row.employee:
-			employee = row.employee.strip()
-			employee = frappe.get_list(
-				"Employee",
-				filters={"teammember_id": employee},
-				fields=["name"],
-				limit=1
-			)
-
-			if employee:
-				emp_doc = frappe.get_doc("Employee", employee[0].name)
-
-				task_row = emp_doc.append("tasks", {})
-				task_row.serial_no = row.serial_no
-				task_row.item_code = row.item_code
-				task_row.item_name = row.item_name
-				task_row.scheduled_date = row.scheduled_date
-				task_row.actual_date = row.actual_date
-				task_row.completion_status = row.completion_status
-				task_row.maintenance_schedule = doc.name
-
-				emp_doc.save()
-				frappe.msgprint(f"Task added for Employee (id): {employee}")
-			else:
-				frappe.log_error(f"Employee with id '{employee}' not found.", "Task Creation Failed")
-				
+			rows_by_member.setdefault(row.employee.strip(), []).append(row)
+	if not rows_by_member:
+		return
+
+	employees = {
+		employee.teammember_id: employee.name
+		for employee in frappe.get_all(
+			"Employee",
+			filters={"teammember_id": ["in", list(rows_by_member)]},
+			fields=["name", "teammember_id"],
+		)
+	}
+	for teammember_id in set(rows_by_member) - set(employees):
+		frappe.log_error(f"Employee with id '{teammember_id}' not found.", "Task Creation Failed")
+
+	bulk_append_child_rows(
+		"Employee",
+		"tasks",
+		[
+			(employee, {
+				"serial_no": row.serial_no,
+				"item_code": row.item_code,
+				"item_name": row.item_name,
+				"scheduled_date": row.scheduled_date,
+				"actual_date": row.actual_date,
+				"completion_status": row.completion_status,
+				"maintenance_schedule": doc.name,
+			})
+			for teammember_id, employee in employees.items()
+			for row in rows_by_member[teammember_id]
+		],
+	)
+
 @frappe.whitelist()
 def get_assigned_employee(customer):
     # Get the first open ToDo for the customer
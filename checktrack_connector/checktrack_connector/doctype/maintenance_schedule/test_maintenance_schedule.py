@@ -1,8 +1,26 @@
 # Copyright (c) 2025, satat tech llp and Contributors
 # See license.txt
 
-# import frappe
+from datetime import date
+from unittest.mock import patch
+
+import frappe
 from frappe.tests import IntegrationTestCase, UnitTestCase
+from frappe.utils import getdate
+
+from checktrack_connector.checktrack_connector.doctype.maintenance_schedule.maintenance_schedule import (
+	create_schedule_logs,
+	materialize_maintenance_schedules,
+)
+from checktrack_connector.checktrack_connector.doctype.task.test_task import (
+	make_test_employee,
+	make_test_task,
+	make_test_task_type,
+)
+
+from checktrack_connector.assignment import TechnicianLoadIndex
+from checktrack_connector.holiday_calendar import previous_working_ordinal
+from checktrack_connector.schedule_dates import get_visit_ordinals
 
 
 # On IntegrationTestCase, the doctype test records and all
@@ -18,8 +36,27 @@ class UnitTestMaintenanceSchedule(UnitTestCase):
 	Use this class for testing individual functions and methods.
 	"""
 
-	pass
+	def test_previous_working_day(self):
+		holidays = [date(2025, 1, day).toordinal() for day in (1, 4, 5, 6)]
+
+		def shift(day):
+			return date.fromordinal(previous_working_ordinal(holidays, date(2025, 1, day).toordinal()))
+
+		self.assertEqual(shift(6), date(2025, 1, 3))
+		self.assertEqual(shift(3), date(2025, 1, 3))
+		self.assertEqual(shift(1), date(2024, 12, 31))
+		self.assertEqual(shift(7), date(2025, 1, 7))
 
+	def test_visit_dates_evenly_spaced(self):
+		start, end = date(2025, 1, 1).toordinal(), date(2025, 12, 31).toordinal()
+
+		visits = get_visit_ordinals(start, end, 4, [])
+		self.assertEqual([date.fromordinal(visit) for visit in visits], [
+			date(2025, 4, 2), date(2025, 7, 2), date(2025, 10, 1), date(2025, 12, 31),
+		])
+
+		# A visit on a holiday moves to the previous working day
+		self.assertEqual(get_visit_ordinals(start, end, 4, [visits[0]])[0], visits[0] - 1)
 
 class IntegrationTestMaintenanceSchedule(IntegrationTestCase):
 	"""
@@ -27,4 +64,84 @@ class IntegrationTestMaintenanceSchedule(IntegrationTestCase):
 	Use this class for testing interactions between multiple components.
 	"""
 
-	pass
+	def test_schedule_logs_grouped_per_employee(self):
+		employee = make_test_employee()
+		schedule = frappe._dict(
+			name="_Test CT Schedule",
+			schedules=[
+				frappe._dict(
+					serial_no="_Test CT Serial",
+					item_code="_Test CT Item",
+					scheduled_date=f"2025-0{month}-01",
+					employee=frappe.db.get_value("Employee", employee, "teammember_id"),
+					completion_status="Pending",
+				)
+				for month in (1, 2, 3)
+			],
+		)
+
+		with self.assertQueryCount(15):
+			create_schedule_logs(schedule)
+
+		self.assertEqual(frappe.db.count("Schedule Log", {"maintenance_schedule": schedule.name}), 3)
+		self.assertEqual(
+			frappe.get_all(
+				"Employee Task Details",
+				filters={"parent": employee, "maintenance_schedule": schedule.name},
+				order_by="idx asc",
+				pluck="scheduled_date",
+			),
+			[getdate(row.scheduled_date) for row in schedule.schedules],
+		)
+
+	def test_technician_load_index(self):
+		make_test_task_type()
+		day = date(2025, 1, 6)
+		technicians = [make_test_employee(f"_test_ct_tech_{suffix}") for suffix in "abc"]
+
+		if not frappe.db.exists("Holiday List", "_Test CT Technician Holidays"):
+			frappe.get_doc({
+				"doctype": "Holiday List",
+				"holiday_list_name": "_Test CT Technician Holidays",
+				"from_date": "2025-01-01",
+				"to_date": "2025-12-31",
+				"holidays": [{"holiday_date": day, "description": "Leave"}],
+			}).insert()
+		frappe.db.set_value("Employee", technicians[2], "holiday_list", "_Test CT Technician Holidays")
+		for _ in range(2):
+			make_test_task(assign_to=technicians[0], due_date=day)
+
+		index = TechnicianLoadIndex(technicians, day, date(2025, 1, 7))
+		first, second, _third = technicians
+
+		# The third is on holiday, the second catches up with the first's open tasks before they alternate
+		self.assertEqual([index.assign(day) for _ in range(4)], [second, second, first, second])
+		self.assertEqual(index.assign(date(2025, 1, 7)), first)
+
+	@patch("frappe.db.commit", new=lambda *args, **kwargs: None)
+	def test_failed_materialization_is_recorded_and_rerun(self):
+		schedule = frappe.new_doc("Maintenance Schedule")
+		schedule.update({"company": "_Test Company", "transaction_date": "2025-01-01", "docstatus": 1})
+		schedule.set_new_name()
+		schedule.db_insert()
+
+		with patch(
+			"checktrack_connector.checktrack_connector.doctype.maintenance_schedule.maintenance_schedule.create_schedule_logs",
+			side_effect=frappe.ValidationError("Schedule Log failed"),
+		):
+			self.assertEqual(materialize_maintenance_schedules([schedule.name]), [])
+
+		status, error = frappe.db.get_value(
+			"Maintenance Schedule", schedule.name, ["materialization_status", "materialization_error"]
+		)
+		self.assertEqual((status, error), ("Failed", "Schedule Log failed"))
+
+		materialize_maintenance_schedules([schedule.name])
+		self.assertEqual(frappe.db.get_value("Maintenance Schedule", schedule.name, "materialization_status"), "Completed")
+
+		# A completed schedule is not materialized twice
+		with patch(
+			"checktrack_connector.checktrack_connector.doctype.maintenance_schedule.maintenance_schedule.create_visit_tasks"
+		) as create_visit_tasks:
+			materialize_maintenance_schedules([schedule.name])
+		create_visit_tasks.assert_not_called()
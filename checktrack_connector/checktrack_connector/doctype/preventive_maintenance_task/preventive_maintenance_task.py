@@ -4,8 +4,20 @@
 import frappe
 from frappe.model.document import Document
 
+from checktrack_connector.checktrack_connector.doctype.task_type.task_type import get_task_type_config
+
 class PreventiveMaintenanceTask(Document):
-    pass
+    def on_update(self):
+        # Submitted once its status reaches an end state of its Task Type. Tasks whose
+        # status came from this doc leave the submit to it (Task.try_submit_linked_doc)
+        config = get_task_type_config(self.doctype)
+        status = self.workflow_status.lower() if self.workflow_status else None
+        if self.docstatus == 0 and config and status in config["end_states"]:
+            self.submit()
+            frappe.logger().info(
+                f"Preventive Maintenance Task '{self.name}' submitted (workflow_status: {self.workflow_status})."
+            )
+
     # def before_save(self):
     #     # Log when before_save is triggered
     #     frappe.log_error(f"PreventiveMaintenanceTask Updated: {self.name}, Status: {self.status}", "PreventiveMaintenanceTask Log")
@@ -1,9 +1,13 @@
 # Copyright (c) 2025, satat tech llp and Contributors
 # See license.txt
 
-# import frappe
+from unittest.mock import patch
+
+import frappe
 from frappe.tests import IntegrationTestCase, UnitTestCase
 
+from checktrack_connector.checktrack_connector.doctype.task.test_task import make_test_pm_task, make_test_task
+
 
 # On IntegrationTestCase, the doctype test records and all
 # link-field test record dependencies are recursively loaded
@@ -27,4 +31,33 @@ class IntegrationTestPreventiveMaintenanceTask(IntegrationTestCase):
 	Use this class for testing interactions between multiple components.
 	"""
 
-	pass
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		if not frappe.db.exists("Task Type", "Preventive Maintenance Task"):
+			frappe.get_doc({
+				"doctype": "Task Type",
+				"task_type": "Preventive Maintenance Task",
+				"status_flow": [
+					{"workflow_status": "Pending", "start_state": 1},
+					{"workflow_status": "Completed", "end_state": 1},
+				],
+			}).insert(ignore_permissions=True)
+
+	def test_submitted_at_end_state(self):
+		pm_task = make_test_pm_task(workflow_status="Pending")
+		self.assertEqual(pm_task.docstatus, 0)
+
+		pm_task.workflow_status = "Completed"
+		pm_task.save()
+		self.assertEqual(frappe.db.get_value("Preventive Maintenance Task", pm_task.name, "docstatus"), 1)
+
+	@patch("checktrack_connector.sync.sync_or_update_task_in_mongo", new=lambda doc, method: None)
+	def test_submitted_from_task_status(self):
+		pm_task = make_test_pm_task(workflow_status="Pending")
+		task = make_test_task(type="Preventive Maintenance Task", task_type_doc=pm_task.name)
+
+		task.workflow_status = "Completed"
+		task.save(ignore_permissions=True)
+		self.assertEqual(frappe.db.get_value("Preventive Maintenance Task", pm_task.name, "docstatus"), 1)
+		self.assertEqual(frappe.db.get_value("Task", task.name, "docstatus"), 1)
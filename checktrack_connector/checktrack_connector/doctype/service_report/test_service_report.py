@@ -1,8 +1,19 @@
 # Copyright (c) 2025, satat tech llp and Contributors
 # See license.txt
 
-# import frappe
+import os
+from unittest.mock import patch
+
+import frappe
 from frappe.tests import IntegrationTestCase, UnitTestCase
+from frappe.utils import add_to_date, now_datetime
+
+from checktrack_connector.report_delivery import (
+	download_report_pdf,
+	get_report_pdf,
+	get_report_pdf_path,
+	process_report_emails,
+)
 
 
 # On IntegrationTestCase, the doctype test records and all
@@ -27,4 +38,63 @@ class IntegrationTestServiceReport(IntegrationTestCase):
 	Use this class for testing interactions between multiple components.
 	"""
 
-	pass
+	@patch("checktrack_connector.report_delivery.render_report_pdf", return_value=b"%PDF-1.4 test")
+	def test_report_pdf_cached_until_changed(self, render_report_pdf):
+		report = frappe.get_doc({"doctype": "Service Report", "place": "Pune"}).insert()
+
+		self.assertEqual(get_report_pdf(report), b"%PDF-1.4 test")
+		self.assertEqual(get_report_pdf(report), b"%PDF-1.4 test")
+		self.assertEqual(render_report_pdf.call_count, 1)
+
+		report.place = "Mumbai"
+		report.save()
+		self.assertFalse(frappe.get_all("File", filters={"attached_to_name": report.name, "file_name": ["like", "report-pdf-%"]}))
+
+		get_report_pdf(report)
+		self.assertEqual(render_report_pdf.call_count, 2)
+
+	@patch("checktrack_connector.report_delivery.render_report_pdf", return_value=b"%PDF-1.4 test")
+	def test_report_pdf_removed_on_rollback(self, render_report_pdf):
+		report = frappe.get_doc({"doctype": "Service Report", "place": "Pune"}).insert()
+
+		path = get_report_pdf_path(report)
+		self.assertTrue(os.path.exists(path))
+		frappe.db.rollback()
+		self.assertFalse(os.path.exists(path))
+
+	def test_report_pdf_print_settings_validated(self):
+		report = frappe.get_doc({"doctype": "Service Report", "place": "Pune"}).insert()
+
+		self.assertRaises(frappe.ValidationError, download_report_pdf, "Service Report", report.name, print_format="_Unknown")
+		self.assertRaises(frappe.ValidationError, download_report_pdf, "Service Report", report.name, letterhead="_Unknown")
+
+	def test_report_email_status_follows_email_queue(self):
+		report = frappe.get_doc({"doctype": "Service Report", "place": "Pune"}).insert()
+		email_queue = frappe.get_doc({"doctype": "Email Queue", "status": "Not Sent", "message": "test"}).insert(
+			ignore_permissions=True
+		)
+		report.db_set({"email_status": "Queued", "email_queue": email_queue.name}, update_modified=False)
+
+		# Handed to the Email Queue but not sent yet
+		process_report_emails()
+		self.assertEqual(frappe.db.get_value("Service Report", report.name, "email_status"), "Queued")
+
+		email_queue.db_set("status", "Sent")
+		process_report_emails()
+		self.assertEqual(frappe.db.get_value("Service Report", report.name, "email_status"), "Sent")
+
+	@patch("checktrack_connector.report_delivery.enqueue_report_email")
+	def test_report_email_retried_after_backoff(self, enqueue_report_email):
+		report = frappe.get_doc({"doctype": "Service Report", "place": "Pune"}).insert()
+		report.db_set(
+			{"email_status": "Queued", "email_attempts": 1, "email_retry_at": add_to_date(now_datetime(), minutes=5)},
+			update_modified=False,
+		)
+
+		process_report_emails()
+		enqueue_report_email.assert_not_called()
+
+		report.db_set("email_retry_at", add_to_date(now_datetime(), minutes=-1), update_modified=False)
+		process_report_emails()
+		enqueue_report_email.assert_called_once_with("Service Report", report.name, 2)
+		self.assertIsNone(frappe.db.get_value("Service Report", report.name, "email_retry_at"))
@@ -95,20 +95,14 @@ frappe.ui.form.on("Task", {
 
         // Check if workflow status has changed and validate required fields
         if (frm.doc.workflow_status && frm.doc.__islocal !== 1) {
-            // Get the original workflow status from the server
-            const original_doc = await frappe.call({
-                method: "frappe.client.get",
-                args: {
-                    doctype: "Task",
-                    name: frm.doc.name
-                }
-            });
+            // Get the original workflow status, Task Type and linked doc from the server in one request
+            const context = await get_task_context(frm, true);
 
-            const original_status = original_doc.message?.workflow_status;
+            const original_status = context.original?.workflow_status;
             
             // If status has changed, validate required fields
             if (original_status !== frm.doc.workflow_status) {
-                const validation_result = await validate_required_fields_for_status(frm, frm.doc.workflow_status);
+                const validation_result = await validate_required_fields_for_status(frm, frm.doc.workflow_status, context);
                 
                 if (!validation_result.valid) {
                     // Show error message with missing fields
@@ -132,21 +126,48 @@ frappe.ui.form.on("Task", {
     }
 });
 
+// Load the Task Type, the saved Task and the linked task_type_doc in a single
+// batched request. The result is kept on the form until the type, linked doc or
+// modified timestamp changes; pass refresh to force a fresh read.
+async function get_task_context(frm, refresh = false) {
+    const task_type = frm.doc.type || "Task";
+    const key = [task_type, frm.doc.task_type_doc || "", frm.doc.name, frm.doc.modified].join("|");
+
+    if (!refresh && frm.__task_context && frm.__task_context.key === key) {
+        return frm.__task_context;
+    }
+
+    const items = [{ doctype: "Task Type", name: task_type, fields: ["name", "status_flow"] }];
+    if (!frm.is_new()) {
+        items.push({ doctype: "Task", name: frm.doc.name, fields: ["name", "workflow_status"] });
+    }
+    if (frm.doc.type && frm.doc.task_type_doc) {
+        items.push({ doctype: frm.doc.type, name: frm.doc.task_type_doc, labels: 1 });
+    }
+
+    const r = await frappe.call({
+        method: "checktrack_connector.api.get_docs_batch",
+        args: { items: items }
+    });
+    const results = r.message || [];
+
+    frm.__task_context = {
+        key: key,
+        task_type: results[0]?.data || null,
+        original: frm.is_new() ? null : (results[1]?.data || null),
+        linked: frm.doc.type && frm.doc.task_type_doc ? (results[items.length - 1]?.data || null) : null,
+        linked_labels: frm.doc.type && frm.doc.task_type_doc ? (results[items.length - 1]?.labels || {}) : {}
+    };
+    return frm.__task_context;
+}
+
 // New function to set default workflow status based on start_state
 async function set_default_workflow_status(frm) {
     try {
-        const task_type = frm.doc.type || "Task";
-        
         // Get the Task Type document with status flow
-        const task_type_doc = await frappe.call({
-            method: "frappe.client.get",
-            args: {
-                doctype: "Task Type",
-                name: task_type
-            }
-        });
+        const context = await get_task_context(frm);
         
-        const status_flow = task_type_doc.message?.status_flow || [];
+        const status_flow = context.task_type?.status_flow || [];
         
         // Find the status with start_state = 1
         const start_status_row = status_flow.find(row => row.start_state === 1);
@@ -177,54 +198,13 @@ function set_task_type_doc_requirements(frm) {
     }
 }
 
-// Helper function to get field labels from doctype meta
-async function get_field_labels(doctype, field_names) {
-    try {
-        // Get the doctype meta to access field definitions
-        const meta = await frappe.call({
-            method: "frappe.client.get",
-            args: {
-                doctype: "DocType",
-                name: doctype
-            }
-        });
-        
-        const fields = meta.message?.fields || [];
-        const field_labels = {};
-        
-        // Map field names to their labels
-        field_names.forEach(field_name => {
-            const field_def = fields.find(f => f.fieldname === field_name);
-            field_labels[field_name] = field_def ? field_def.label : field_name;
-        });
-        
-        return field_labels;
-    } catch (error) {
-        console.error("Error getting field labels:", error);
-        // Return field names as fallback
-        const fallback_labels = {};
-        field_names.forEach(field_name => {
-            fallback_labels[field_name] = field_name;
-        });
-        return fallback_labels;
-    }
-}
-
 // New function to validate required fields for status change
-async function validate_required_fields_for_status(frm, target_status) {
-    const task_type = frm.doc.type || "Task";
-    
+async function validate_required_fields_for_status(frm, target_status, context) {
     try {
-        // Get the Task Type document with status flow
-        const task_type_doc = await frappe.call({
-            method: "frappe.client.get",
-            args: {
-                doctype: "Task Type",
-                name: task_type
-            }
-        });
+        // Task Type status flow and linked doc come from the batched form context
+        context = context || await get_task_context(frm);
         
-        const status_flow = task_type_doc.message?.status_flow || [];
+        const status_flow = context.task_type?.status_flow || [];
         
         // Find the status flow row for the target status
         const target_status_row = status_flow.find(row => row.workflow_status === target_status);
@@ -253,16 +233,8 @@ async function validate_required_fields_for_status(frm, target_status) {
             };
         }
         
-        // Get the task_type_doc to check field values
-        const task_type_doc_data = await frappe.call({
-            method: "frappe.client.get",
-            args: {
-                doctype: frm.doc.type,
-                name: frm.doc.task_type_doc
-            }
-        });
-        
-        const doc_data = task_type_doc_data.message;
+        // Check field values on the task_type_doc loaded with the context
+        const doc_data = context.linked || {};
         const missing_field_names = [];
         
         // Check each required field
@@ -273,11 +245,8 @@ async function validate_required_fields_for_status(frm, target_status) {
         });
         
         if (missing_field_names.length > 0) {
-            // Get field labels for the missing fields
-            const field_labels = await get_field_labels(frm.doc.type, missing_field_names);
-            
-            // Convert field names to labels
-            const missing_field_labels = missing_field_names.map(field_name => field_labels[field_name]);
+            // Convert field names to labels returned alongside the linked doc
+            const missing_field_labels = missing_field_names.map(field_name => context.linked_labels[field_name] || field_name);
             
             return {
                 valid: false,
@@ -306,75 +275,52 @@ function render_status_ui(frm) {
     }
     wrapper.empty();
 
-    // If no type selected, use "Task" as default type
-    const task_type = frm.doc.type || "Task";
-
-    // Call server to get status list based on selected type (or "Task" if no type selected)
-    frappe.call({
-        method: "frappe.client.get_list",
-        args: {
-            doctype: "Task Type",
-            filters: {
-                name: task_type
-            },
-            fields: ["name"],
-            limit: 1
-        },
-        callback: function (res) {
-            const doc = res.message?.[0];
-            if (!doc) {
-                render_status_dropdown(wrapper, frm, ['Pending'], []);
-                return;
-            }
-            
-            frappe.call({
-                method: "frappe.client.get",
-                args: {
-                    doctype: "Task Type",
-                    name: doc.name
-                },
-                callback: function (r) {
-                    const status_flow = r.message.status_flow || [];
-                    const all_statuses = status_flow.map(row => row.workflow_status);
-                    
-                    if (!all_statuses.length) {
-                        render_status_dropdown(wrapper, frm, ['Pending'], []);
-                        return;
-                    }
+    // Status list comes from the Task Type of the selected type (or "Task" if no type selected)
+    get_task_context(frm).then(context => {
+        const doc = context.task_type;
+        if (!doc) {
+            render_status_dropdown(wrapper, frm, ['Pending'], []);
+            return;
+        }
 
-                    // Get valid next statuses based on current status
-                    const current_status = frm.doc.workflow_status;
-                    let valid_next_statuses = [];
+        const status_flow = doc.status_flow || [];
+        const all_statuses = status_flow.map(row => row.workflow_status);
+        
+        if (!all_statuses.length) {
+            render_status_dropdown(wrapper, frm, ['Pending'], []);
+            return;
+        }
 
-                    if (current_status) {
-                        // Find all rows where workflow_status matches current status
-                        const matching_rows = status_flow.filter(row => row.workflow_status === current_status);
-                        
-                        // Get all possible next statuses and split comma-separated values
-                        valid_next_statuses = matching_rows
-                            .map(row => row.workflow_status_change_to)
-                            .filter(status => status) // Remove empty values
-                            .flatMap(status => status.split(',')) // Split comma-separated values
-                            .map(status => status.trim()) // Remove whitespace
-                            .map(status => status.replace(/['"]/g, '')) // Remove quotes
-                            .filter(status => status); // Remove empty strings
-                        
-                        // Remove duplicates
-                        valid_next_statuses = [...new Set(valid_next_statuses)];
-                        
-                        // Always include current status as an option
-                        if (!valid_next_statuses.includes(current_status)) {
-                            valid_next_statuses.unshift(current_status);
-                        }
-                    } else {
-                        // If no current status, show all available statuses
-                        valid_next_statuses = all_statuses;
-                    }
+        // Get valid next statuses based on current status
+        const current_status = frm.doc.workflow_status;
+        let valid_next_statuses = [];
 
-                    render_status_dropdown(wrapper, frm, all_statuses, valid_next_statuses);
-                }
-            });
+        if (current_status) {
+            // Find all rows where workflow_status matches current status
+            const matching_rows = status_flow.filter(row => row.workflow_status === current_status);
+            
+            // Get all possible next statuses and split comma-separated values
+            valid_next_statuses = matching_rows
+                .map(row => row.workflow_status_change_to)
+                .filter(status => status) // Remove empty values
+                .flatMap(status => status.split(',')) // Split comma-separated values
+                .map(status => status.trim()) // Remove whitespace
+                .map(status => status.replace(/['"]/g, '')) // Remove quotes
+                .filter(status => status); // Remove empty strings
+            
+            // Remove duplicates
+            valid_next_statuses = [...new Set(valid_next_statuses)];
+            
+            // Always include current status as an option
+            if (!valid_next_statuses.includes(current_status)) {
+                valid_next_statuses.unshift(current_status);
+            }
+        } else {
+            // If no current status, show all available statuses
+            valid_next_statuses = all_statuses;
         }
+
+        render_status_dropdown(wrapper, frm, all_statuses, valid_next_statuses);
     });
 }
 
@@ -1,17 +1,19 @@
 # For license information, please see license.txt
 
 import frappe
+from frappe.model import default_fields
 from frappe.utils.nestedset import NestedSet
 
+from checktrack_connector.checktrack_connector.doctype.task_type.task_type import get_task_type_config
+from checktrack_connector.nestedset import update_nested_set
+
 class Task(NestedSet):
     def before_save(self):
         # Store the status transition for use in on_update
         if not hasattr(self, '_original_status'):
-            if self.is_new():
-                self._original_status = None
-            else:
-                old_doc = frappe.get_doc('Task', self.name)
-                self._original_status = old_doc.workflow_status.lower() if old_doc.workflow_status else None
+            # doc_before_save is already loaded by frappe for existing docs, no extra query needed
+            old_doc = None if self.is_new() else self.get_doc_before_save()
+            self._original_status = old_doc.workflow_status.lower() if old_doc and old_doc.workflow_status else None
 
         if self.watchers:
             ids = [row.employee for row in self.watchers if row.employee]
@@ -20,30 +22,21 @@ class Task(NestedSet):
             self.watchers_id = ""
 
     def on_update(self):
-        set_dynamic_fields(self)
-        # First handle linked document status update
-        self.update_linked_doc_status()
+        # lft/rgt only change for new Tasks and parent_task moves (deferred in bulk inserts)
+        update_nested_set(self)
+
+        # Compiled Task Type config is shared between field mapping and end-state checks
+        config = get_task_type_config_for(self)
+        set_dynamic_fields(self, config)
 
-        self.update_linked_doc_task_field()
+        # First handle linked document status and task field update
+        self.update_linked_doc()
 
         # Then handle submission logic when status changes to Completed/Cancelled
         try:
             current_status = self.workflow_status.lower() if self.workflow_status else None
             is_status_change = not hasattr(self, '_original_status') or self._original_status != current_status
-            task_type_name = self.type or "Task"
-            submittable_statuses = []
-            try:
-                task_type_doc = frappe.get_doc("Task Type", task_type_name)
-                submittable_statuses = [
-                    row.workflow_status.lower()
-                    for row in task_type_doc.status_flow
-                    if row.end_state == 1
-                ]
-            except Exception as e:
-                frappe.log_error(
-                    title="Dynamic End State Fallback Error",
-                    message=f"Failed to fetch Task Type '{task_type_name}' for Task '{self.name}':\n{e}"
-                )
+            submittable_statuses = config["end_states"] if config else set()
 
             # Check status in a case-insensitive way
             if is_status_change and current_status in submittable_statuses:
@@ -55,27 +48,49 @@ class Task(NestedSet):
                 message=f"Failed to submit Task {self.name} or linked doc:\n{frappe.get_traceback()}"
             )
 
-    def update_linked_doc_status(self):
-        if not (self.type and self.task_type_doc):
+    def update_linked_doc(self):
+        """
+        Push workflow_status and the Task back-reference ('task' field) to the
+        dynamically linked document with a single load. The back-reference is written
+        directly, whatever the user's permissions on the linked doc; the status is
+        saved through the doc with the user's permissions.
+
+        Skipped when this save was propagated from the linked document itself.
+        """
+        if not (self.type and self.task_type_doc) or self.flags.from_linked_propagation:
             return
         try:
-            if frappe.db.exists(self.type, self.task_type_doc):
+            try:
                 doc = frappe.get_doc(self.type, self.task_type_doc)
-                doc.workflow_status = self.workflow_status
-                doc.save()
-                frappe.log_error(
-                    title="Linked Document Status Sync",
-                    message=f"Updated workflow_status of linked doc '{self.type}' ({self.task_type_doc}) to '{self.workflow_status}' from Task '{self.name}'."
-                )
-            else:
+            except frappe.DoesNotExistError:
+                frappe.clear_last_message()
                 frappe.log_error(
                     title="Linked Document Missing",
                     message=f"Linked document '{self.type}' ({self.task_type_doc}) not found for Task '{self.name}'."
                 )
+                return
+
+            if doc.meta.has_field("task") and doc.task != self.name:
+                # Nothing for the linked doc to validate, kept even if the status save below fails
+                frappe.db.set_value(self.type, self.task_type_doc, "task", self.name, update_modified=False)
+                doc.task = self.name
+
+            if not doc.meta.has_field("workflow_status") or doc.workflow_status == self.workflow_status:
+                return
+
+            doc.workflow_status = self.workflow_status
+            # Lets the linked doc's hooks (api.update_related_tasks) skip this Task
+            doc.flags.from_task_propagation = self.name
+            doc.save()
+
+            frappe.logger().info(
+                f"Updated linked doc '{self.type}' ({self.task_type_doc}) from Task '{self.name}' "
+                f"(workflow_status: {self.workflow_status})"
+            )
         except Exception:
             frappe.log_error(
                 title="Linked Document Sync Error",
-                message=f"Failed to update status of linked doc '{self.type}' ({self.task_type_doc}) from Task '{self.name}':\n{frappe.get_traceback()}"
+                message=f"Failed to update linked doc '{self.type}' ({self.task_type_doc}) from Task '{self.name}':\n{frappe.get_traceback()}"
             )
 
     def try_submit_self(self):
@@ -85,15 +100,15 @@ class Task(NestedSet):
                 if hasattr(self, 'validate_for_submit'):
                     self.validate_for_submit()
                 self.submit()
-                frappe.log_error(
-                    title="Task Self Submitted",
-                    message=f"Task '{self.name}' submitted successfully (workflow_status: {self.workflow_status})."
+                frappe.logger().info(
+                    f"Task '{self.name}' submitted successfully (workflow_status: {self.workflow_status})."
                 )
         except Exception:
             raise  # Error logged by caller
 
     def try_submit_linked_doc(self):
-        if not (self.type and self.task_type_doc):
+        # The linked doc started this save and submits through its own flow
+        if not (self.type and self.task_type_doc) or self.flags.from_linked_propagation:
             return
         if not frappe.db.exists(self.type, self.task_type_doc):
             return
@@ -101,115 +116,198 @@ class Task(NestedSet):
             doc = frappe.get_doc(self.type, self.task_type_doc)
             if doc.docstatus == 0:
                 doc.submit()
-                frappe.log_error(
-                    title="Linked Document Submitted",
-                    message=f"Linked doc '{self.type}' ({self.task_type_doc}) submitted from Task '{self.name}'."
+                frappe.logger().info(
+                    f"Linked doc '{self.type}' ({self.task_type_doc}) submitted from Task '{self.name}'."
                 )
         except Exception:
             raise  # Error logged by caller
 
-    def update_linked_doc_task_field(self):
-        """Update 'task' field in the dynamically linked document with the Task's name (ID)"""
-        if not (self.type and self.task_type_doc):
-            return
-        try:
-            if frappe.db.exists(self.type, self.task_type_doc):
-                linked_doc = frappe.get_doc(self.type, self.task_type_doc)
-                if hasattr(linked_doc, "task"):
-                    linked_doc.task = self.name
-                    # Try multiple permission bypass methods
-                    linked_doc.flags.ignore_permissions = True
-                    linked_doc.flags.ignore_validate = True
-                    linked_doc.save(ignore_permissions=True)
-                    frappe.db.commit()  # Ensure changes are committed
-                    frappe.log_error(
-                        title="Linked Document Task Field Update",
-                        message=f"Set 'task' field of '{self.type}' ({self.task_type_doc}) to Task ID '{self.name}'"
-                    )
-        except Exception as e:
-            frappe.log_error(
-                title="Linked Doc Task Field Update Error",
-                message=f"Failed to update 'task' field of linked doc '{self.type}' ({self.task_type_doc}) from Task '{self.name}':\n{str(e)}\n{frappe.get_traceback()}"
-            )
-            
-def set_dynamic_fields(doc):
-    # Find the field mapping document for the Task doctype
+def get_task_type_config_for(doc):
     task_type = doc.type or "Task"
-    mapping_doc = frappe.get_doc("Task Type", task_type)
-    if not mapping_doc:
-        return
-
-    for mapping in mapping_doc.field_mapping:
-        try:
-            value = doc
-            prev_doc = doc
-            prev_field = None
-
-            for part in mapping.source_path.split("."):
-                if not value:
-                    value = ""  # If any intermediate object is None, break and assign ""
-                    break
-
-                # If value is a string, try to resolve as linked document
-                if isinstance(value, str) and prev_doc and prev_field:
-                    value = resolve_linked_doc(prev_doc, prev_field, value)
-
-                prev_doc = value
-                prev_field = part
+    config = get_task_type_config(task_type)
+    if not config:
+        frappe.log_error(
+            title="Dynamic End State Fallback Error",
+            message=f"Task Type '{task_type}' not found for Task '{doc.name}'"
+        )
+    return config
 
-                value = getattr(value, part, "") if hasattr(value, part) else ""
+def set_dynamic_fields(doc, config=None):
+    # Compiled field mapping / status flow of the Task's Task Type
+    if config is None:
+        config = get_task_type_config_for(doc)
+    if not config:
+        return
 
+    # All derived values are collected and written with a single UPDATE
+    updates = get_derived_field_updates({doc.name: doc}, config)[doc.name]
+    write_derived_fields(doc, updates)
+
+def get_derived_field_updates(tasks, config):
+    """
+    Derived field values (mapped values, labels, status color) for many Tasks of the same
+    Task Type. `tasks` maps Task name to the Task doc or a row with the mapped source columns.
+    """
+    resolved = resolve_mapping_values(tasks, config["mappings"])
+    updates = {}
+
+    for name, task in tasks.items():
+        task_updates = {}
+        for mapping in config["mappings"]:
+            value = resolved[mapping["source_path"]].get(name)
             # Default to empty string if None
-            final_value = value if value else ""
-            final_label = mapping.label_text or ""
-
-            # Set both in object and DB
-            setattr(doc, mapping.target_field, final_value)
-            setattr(doc, mapping.label_field, final_label)
-
-            doc.db_set(mapping.target_field, final_value)
-            doc.db_set(mapping.label_field, final_label)
-
-        except Exception as e:
-            frappe.log_error(f"Failed to resolve path: {mapping.source_path}\nError: {e}", "Task Mapping Error")
-            doc.db_set(mapping.target_field, "")
-            doc.db_set(mapping.label_field, mapping.label_text or "")
-
-    # Handle status-based color assignment
-    try:
-        current_status = doc.workflow_status
-        status_color = next(
-            (row.color for row in mapping_doc.status_flow if row.workflow_status == current_status), None
-        )
+            task_updates[mapping["target_field"]] = value if value else ""
+            task_updates[mapping["label_field"]] = mapping["label_text"]
 
+        # Handle status-based color assignment
+        status_color = config["colors"].get(task.get("workflow_status"))
         if status_color:
-            doc.color = status_color
-            doc.db_set("color", status_color)
-
-    except Exception as e:
-        frappe.log_error(f"Failed to assign color for status: {doc.status}\nError: {e}", "Status Color Mapping Error")
-        doc.db_set("color", "")
-
-def resolve_linked_doc(parent_doc, fieldname, value):
-    """Get linked DocType from fieldname of parent_doc and fetch the document by value."""
-    try:
-        if not hasattr(parent_doc, "doctype") or not value:
-            return value
-
-        meta = frappe.get_meta(parent_doc.doctype)
-        field = next((f for f in meta.fields if f.fieldname == fieldname), None)
-
-        if field and field.fieldtype == "Link":
-            return frappe.get_doc(field.options, value)
-        elif field and field.fieldtype == "Dynamic Link":
-            linked_doctype = getattr(parent_doc, field.options, None)
-            return frappe.get_doc(linked_doctype, value) if linked_doctype else value
-
-    except Exception as e:
-        frappe.log_error(f"Failed to resolve linked doc for field: {fieldname}\nError: {e}", "Link Resolver Error")
-        return value
-
-    return value
+            task_updates["color"] = status_color
+
+        updates[name] = task_updates
+
+    return updates
+
+def update_task_derived_fields(task_names, config):
+    """
+    Bulk mode of `set_dynamic_fields`: recompute derived fields of many Tasks of one Task
+    Type and write only the rows that changed, without loading the Tasks or firing hooks.
+    """
+    columns = {"workflow_status", "color"} | get_hop_columns("Task", (), build_mapping_tree(config["mappings"]))
+    for mapping in config["mappings"]:
+        columns.update((mapping["target_field"], mapping["label_field"]))
+
+    rows = {
+        row.name: row
+        for row in frappe.get_all("Task", filters={"name": ["in", task_names]}, fields=["name", *columns])
+    }
+    changed = {}
+    for name, task_updates in get_derived_field_updates(rows, config).items():
+        diff = {field: value for field, value in task_updates.items() if rows[name].get(field) != value}
+        if diff:
+            changed[name] = diff
+
+    if changed:
+        frappe.db.bulk_update("Task", changed, update_modified=False)
+    return len(changed)
+
+def build_mapping_tree(mappings):
+    """
+    Index compiled mappings by hop prefix (tuple of link fieldnames): the hop leading to
+    each prefix, the prefixes one hop below it and the final fields read at it.
+    """
+    tree = {"hops": {}, "children": {(): []}, "fields": {(): set()}}
+    for mapping in mappings:
+        prefix = ()
+        for hop in mapping["hops"]:
+            parent, prefix = prefix, prefix + (hop["fieldname"],)
+            if prefix not in tree["hops"]:
+                tree["hops"][prefix] = hop
+                tree["children"][parent].append(prefix)
+                tree["children"][prefix] = []
+                tree["fields"][prefix] = set()
+        tree["fields"][prefix].add(mapping["field"])
+    return tree
+
+def resolve_mapping_values(tasks, mappings):
+    """
+    Resolve compiled mapping paths for many Tasks at once.
+
+    Mappings are walked as a tree of hop prefixes, so a link shared by several mappings
+    (e.g. `task_type_doc`) is fetched once. Every hop is a single query per linked doctype
+    that reads only the columns the mappings below it need.
+
+    Returns {source_path: {task name: value}}.
+    """
+    tree = build_mapping_tree(mappings)
+
+    # prefix -> {task name: (doctype, row)} of the doc reached through that prefix
+    nodes = {(): {name: ("Task", task) for name, task in tasks.items()}}
+    pending = list(tree["children"][()])
+    while pending:
+        prefix = pending.pop(0)
+        nodes[prefix] = follow_mapping_hop(prefix, nodes[prefix[:-1]], tree)
+        pending.extend(tree["children"][prefix])
+
+    resolved = {}
+    for mapping in mappings:
+        prefix = tuple(hop["fieldname"] for hop in mapping["hops"])
+        resolved[mapping["source_path"]] = {
+            name: row.get(mapping["field"]) for name, (doctype, row) in nodes[prefix].items()
+        }
+    return resolved
+
+def follow_mapping_hop(prefix, parents, tree):
+    """Fetch the docs one hop below `parents`, grouped into one query per linked doctype."""
+    hop = tree["hops"][prefix]
+    if hop.get("invalid"):
+        return {}
+
+    targets = {}
+    for task_name, (doctype, row) in parents.items():
+        name = row.get(hop["fieldname"])
+        link_doctype = get_hop_link_doctype(hop, doctype, row)
+        if name and link_doctype:
+            targets.setdefault(link_doctype, {})[task_name] = name
+
+    nodes = {}
+    for link_doctype, names in targets.items():
+        try:
+            rows = {
+                row.name: row
+                for row in frappe.get_all(
+                    link_doctype,
+                    filters={"name": ["in", list(set(names.values()))]},
+                    fields=["name", *get_hop_columns(link_doctype, prefix, tree)],
+                )
+            }
+        except Exception as e:
+            frappe.log_error(f"Failed to resolve path hop: {'.'.join(prefix)} ({link_doctype})\nError: {e}", "Task Mapping Error")
+            continue
+
+        for task_name, name in names.items():
+            if name in rows:
+                nodes[task_name] = (link_doctype, rows[name])
+
+    return nodes
+
+def get_hop_link_doctype(hop, doctype, row):
+    if hop["link_doctype"]:
+        return hop["link_doctype"]
+    if hop["doctype_field"]:
+        return row.get(hop["doctype_field"])
+
+    # Hop below a Dynamic Link: the doctype is only known now
+    df = frappe.get_meta(doctype).get_field(hop["fieldname"])
+    if df and df.fieldtype == "Link":
+        return df.options
+    if df and df.fieldtype == "Dynamic Link":
+        return row.get(df.options)
+
+def get_hop_columns(doctype, prefix, tree):
+    """Columns of `doctype` read at `prefix`: final mapped fields and links followed further down."""
+    meta = frappe.get_meta(doctype)
+    columns = set(tree["fields"][prefix])
+    for child in tree["children"][prefix]:
+        hop = tree["hops"][child]
+        columns.add(hop["fieldname"])
+        if hop["doctype_field"]:
+            columns.add(hop["doctype_field"])
+        elif not hop["link_doctype"]:
+            df = meta.get_field(hop["fieldname"])
+            if df and df.fieldtype == "Dynamic Link":
+                columns.add(df.options)
+
+    # Unknown fields resolve to "" like before instead of breaking the query
+    return {column for column in columns if column != "name" and (meta.has_field(column) or column in default_fields)}
+
+def write_derived_fields(doc, updates):
+    """Set derived values on the doc and flush the ones that changed in one UPDATE."""
+    changed = {field: value for field, value in updates.items() if doc.get(field) != value}
+    for field, value in updates.items():
+        doc.set(field, value)
+    if changed:
+        frappe.db.set_value(doc.doctype, doc.name, changed, update_modified=False)
 
 
 # def get_permission_query_conditions(user):
@@ -277,3 +375,8 @@ def resolve_linked_doc(parent_doc, fieldname, value):
 #             return True
 
 #     return False
+
+
+def on_doctype_update():
+    # Nested set rebuilds look rows up by range
+    frappe.db.add_index("Task", ["lft", "rgt"])
@@ -1,5 +1,20 @@
+from unittest.mock import patch
+
+import frappe
 from frappe.tests import IntegrationTestCase, UnitTestCase
 
+from checktrack_connector.checktrack_connector.doctype.task.task import (
+	resolve_mapping_values,
+	update_task_derived_fields,
+)
+from checktrack_connector.checktrack_connector.doctype.task_type.task_type import (
+	compile_field_mapping,
+	get_task_type_config,
+)
+from checktrack_connector.api import get_task_changes, get_task_subtree
+from checktrack_connector.nestedset import deferred_nested_set
+from checktrack_connector.task_graph import analyse_task_graph
+
 
 # On IntegrationTestCase, the doctype test records and all
 # link-field test record dependencies are recursively loaded
@@ -7,6 +22,102 @@ from frappe.tests import IntegrationTestCase, UnitTestCase
 EXTRA_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
 IGNORE_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
 
+# Upper bound of queries for saving an existing Task with a status change, per step:
+# - doc before save: Task row + 2 child tables (depends_on, watchers)       3
+# - check_if_latest (SELECT ... FOR UPDATE)                                  1
+# - link validation of the set links (company, assign_to)                    2
+# - ERPNext running-deletion check for doctypes with a company               1
+# - UPDATE Task + stale-row DELETE per child table                           3
+# - field mapping: one Employee read, one UPDATE of the derived fields       2
+# - subtree cache: ancestors range query                                     1
+# - framework "*" hooks (assignment rules, notifications, webhooks) on cold
+#   caches                                                                   3
+TASK_SAVE_QUERY_BUDGET = 16
+
+
+def make_test_company():
+	if not frappe.db.exists("Company", "_Test CT Company"):
+		frappe.get_doc({
+			"doctype": "Company",
+			"company_name": "_Test CT Company",
+			"tenant_id": "_test_tenant",
+			"prefix": "test",
+		}).insert(ignore_permissions=True)
+	return "_Test CT Company"
+
+
+def make_test_employee(teammember_id="_test_ct_employee"):
+	if not frappe.db.exists("Employee", teammember_id):
+		frappe.get_doc({
+			"doctype": "Employee",
+			"teammember_id": teammember_id,
+			"first_name": "Test",
+			"last_name": "Technician",
+			"company": make_test_company(),
+		}).insert(ignore_permissions=True)
+	return teammember_id
+
+
+def make_test_task_type():
+	if not frappe.db.exists("Task Type", "Task"):
+		frappe.get_doc({
+			"doctype": "Task Type",
+			"task_type": "Task",
+			"status_flow": [
+				{"workflow_status": "Pending", "start_state": 1, "color": "#ffa00a"},
+				{"workflow_status": "Working", "working_state": 1, "color": "#2490ef"},
+				{"workflow_status": "Completed", "end_state": 1, "color": "#29cd42"},
+			],
+			"field_mapping": [
+				{
+					"source_path": "assign_to.employee_name",
+					"target_field": "assign_to_value",
+					"label_field": "assign_to_label",
+					"label_text": "Assigned To",
+				},
+			],
+		}).insert(ignore_permissions=True)
+	return "Task"
+
+
+def make_test_pm_task(**kwargs):
+	if not frappe.db.exists("Customer", {"customer_name": "_Test CT Customer"}):
+		frappe.get_doc({
+			"doctype": "Customer",
+			"naming_series": "CUST-.YYYY.-",
+			"customer_name": "_Test CT Customer",
+			"customer_type": "Company",
+			"customer_email": "ct-customer@example.com",
+			"customer_phone": "9876543210",
+		}).insert(ignore_permissions=True)
+	customer = frappe.db.get_value("Customer", {"customer_name": "_Test CT Customer"})
+	if not frappe.db.exists("Customer Items", "_Test CT Instrument"):
+		frappe.get_doc({"doctype": "Customer Items", "serial_no": "_Test CT Instrument", "customer": customer}).insert(
+			ignore_permissions=True
+		)
+
+	pm_task = frappe.get_doc({
+		"doctype": "Preventive Maintenance Task",
+		"customer": customer,
+		"item": "_Test CT Instrument",
+		**kwargs,
+	})
+	pm_task.insert(ignore_permissions=True)
+	return pm_task
+
+
+def make_test_task(**kwargs):
+	task = frappe.get_doc({
+		"doctype": "Task",
+		"task_name": "_Test CT Task",
+		"company": make_test_company(),
+		"assign_to": make_test_employee(),
+		"workflow_status": "Pending",
+		**kwargs,
+	})
+	task.insert(ignore_permissions=True)
+	return task
+
 
 class UnitTestTask(UnitTestCase):
 	"""
@@ -14,13 +125,153 @@ class UnitTestTask(UnitTestCase):
 	Use this class for testing individual functions and methods.
 	"""
 
-	pass
+	def test_dependency_graph_analysis(self):
+		def node(expected_time, done=False):
+			return {"expected_time": expected_time, "workflow_status": None, "done": done}
+
+		graph = {
+			"nodes": {"A": node(1, done=True), "B": node(5), "C": node(2), "D": node(1), "X": node(1), "Y": node(1)},
+			# task -> prerequisites, X and Y wait on each other
+			"edges": {"A": [], "B": ["A"], "C": ["A"], "D": ["B", "C"], "X": ["Y"], "Y": ["X"]},
+		}
+		analysis = analyse_task_graph(graph)
 
+		self.assertEqual(analysis["order"], ["A", "B", "C", "D"])
+		self.assertEqual(analysis["critical_path"], ["A", "B", "D"])
+		self.assertEqual(analysis["critical_path_time"], 7)
+		self.assertEqual(analysis["cycles"], ["X", "Y"])
+		self.assertEqual(analysis["blocked"], ["D", "X", "Y"])
 
+
+@patch("checktrack_connector.sync.sync_or_update_task_in_mongo", new=lambda doc, method: None)
 class IntegrationTestTask(IntegrationTestCase):
 	"""
 	Integration tests for Task.
 	Use this class for testing interactions between multiple components.
 	"""
 
-	pass
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		make_test_task_type()
+
+	def test_derived_fields_set_on_save(self):
+		task = make_test_task()
+
+		values = frappe.db.get_value("Task", task.name, ["assign_to_value", "assign_to_label", "color"], as_dict=True)
+		self.assertEqual(values.assign_to_value, "Test Technician")
+		self.assertEqual(values.assign_to_label, "Assigned To")
+		self.assertEqual(values.color, "#ffa00a")
+
+	def test_save_query_budget(self):
+		task = make_test_task()
+		task.reload()
+		task.workflow_status = "Working"
+
+		with self.assertQueryCount(TASK_SAVE_QUERY_BUDGET):
+			task.save(ignore_permissions=True)
+
+		self.assertEqual(frappe.db.get_value("Task", task.name, "color"), "#2490ef")
+
+	def test_derived_fields_queries_constant_in_mappings(self):
+		tasks = {task.name: task for task in (make_test_task(), make_test_task())}
+		mappings = [
+			compile_field_mapping("Task", frappe._dict(source_path=f"assign_to.{field}", target_field=field))
+			for field in ("employee_name", "first_name", "last_name", "company")
+		]
+
+		def count_queries(mappings):
+			with patch.object(frappe.db, "sql", wraps=frappe.db.sql) as sql:
+				resolved = resolve_mapping_values(tasks, mappings)
+			return sql.call_count, resolved
+
+		count_queries(mappings)  # load meta outside the count
+		one_mapping, _resolved = count_queries(mappings[:1])
+		all_mappings, resolved = count_queries(mappings)
+
+		# Mappings through the same link share one query, whatever their number
+		self.assertEqual(one_mapping, 1)
+		self.assertEqual(all_mappings, one_mapping)
+		self.assertEqual(set(resolved["assign_to.first_name"].values()), {"Test"})
+
+	def test_linked_doc_back_reference_without_permission(self):
+		pm_task = make_test_pm_task()
+		self.addCleanup(frappe.set_user, "Administrator")
+		frappe.set_user("Guest")
+
+		# Guest can't save the PM Task: the status push fails, the back-reference is still set
+		task = make_test_task(type="Preventive Maintenance Task", task_type_doc=pm_task.name)
+		frappe.set_user("Administrator")
+		values = frappe.db.get_value("Preventive Maintenance Task", pm_task.name, ["task", "workflow_status"], as_dict=True)
+		self.assertEqual(values.task, task.name)
+		self.assertFalse(values.workflow_status)
+
+	def test_bulk_derived_fields_update(self):
+		tasks = [make_test_task().name for _ in range(3)]
+		frappe.db.set_value("Task", {"name": ["in", tasks]}, "assign_to_value", "Stale", update_modified=False)
+
+		self.assertEqual(update_task_derived_fields(tasks, get_task_type_config("Task")), 3)
+		self.assertEqual(
+			set(frappe.get_all("Task", filters={"name": ["in", tasks]}, pluck="assign_to_value")),
+			{"Test Technician"},
+		)
+
+	def test_deferred_nested_set(self):
+		with deferred_nested_set("Task"):
+			parent = make_test_task(is_group=1)
+			children = [make_test_task(parent_task=parent.name).name for _ in range(3)]
+			self.assertFalse(frappe.db.get_value("Task", children[0], "lft"))
+
+		parent.reload()
+		for child in children:
+			lft, rgt = frappe.db.get_value("Task", child, ["lft", "rgt"])
+			self.assertTrue(parent.lft < lft < rgt < parent.rgt)
+		self.assertEqual(parent.rgt - parent.lft, 2 * len(children) + 1)
+
+	def test_deferred_nested_set_rebuilds_touched_trees(self):
+		first = make_test_task(is_group=1)
+		second = make_test_task(is_group=1)
+		second_child = make_test_task(parent_task=second.name)
+
+		with deferred_nested_set("Task"):
+			first_child = make_test_task(parent_task=first.name)
+
+		# The grown tree pushes the one after it to the right, keeping both consistent
+		first_lft, first_rgt = frappe.db.get_value("Task", first.name, ["lft", "rgt"])
+		second_lft, second_rgt = frappe.db.get_value("Task", second.name, ["lft", "rgt"])
+		child_lft, child_rgt = frappe.db.get_value("Task", first_child.name, ["lft", "rgt"])
+		self.assertEqual((child_lft, child_rgt), (first_lft + 1, first_lft + 2))
+		self.assertEqual(first_rgt, first_lft + 3)
+		self.assertGreater(second_lft, first_rgt)
+		lft, rgt = frappe.db.get_value("Task", second_child.name, ["lft", "rgt"])
+		self.assertTrue(second_lft < lft < rgt < second_rgt)
+
+	def test_task_subtree_rollup(self):
+		parent = make_test_task(is_group=1, expected_time=1)
+		make_test_task(parent_task=parent.name, progress=100, expected_time=2, workflow_status="Completed")
+		child = make_test_task(parent_task=parent.name, progress=50, expected_time=3)
+
+		nodes = get_task_subtree(parent.name)["nodes"]
+		self.assertEqual(nodes[0]["name"], parent.name)
+		self.assertEqual(nodes[0]["rollup"]["task_count"], 3)
+		self.assertEqual(nodes[0]["rollup"]["expected_time"], 6)
+		self.assertEqual(nodes[0]["rollup"]["progress"], 75)
+		self.assertEqual(nodes[0]["rollup"]["status_counts"], {"Pending": 2, "Completed": 1})
+
+		# Saving a child refreshes the cached subtree of its parent
+		child.progress = 100
+		child.save(ignore_permissions=True)
+		self.assertEqual(get_task_subtree(parent.name)["nodes"][0]["rollup"]["progress"], 100)
+
+	def test_task_changes_send_tombstone_once(self):
+		task = make_test_task()
+		cursor = frappe.as_json({"modified": str(task.modified), "name": task.name})
+		frappe.delete_doc("Task", task.name, ignore_permissions=True)
+
+		first = get_task_changes(cursor, assign_to=task.assign_to)
+		self.assertIn(task.name, [tombstone["name"] for tombstone in first["deleted"]])
+
+		# Polling again with the returned cursor does not repeat the deletion
+		second = get_task_changes(frappe.as_json(first["cursor"]), assign_to=task.assign_to)
+		self.assertNotIn(task.name, [tombstone["name"] for tombstone in second["deleted"]])
+		self.assertEqual(second["cursor"]["deleted_at"], first["cursor"]["deleted_at"])
@@ -1,9 +1,181 @@
 # Copyright (c) 2025, satat tech llp and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
+from frappe import _
 from frappe.model.document import Document
+from frappe.query_builder.functions import Count
+from frappe.utils import cint
+
+TASK_TYPE_CONFIG_CACHE_KEY = "task_type_config"
+
+# Tasks recomputed and written per transaction by the derived fields job
+DERIVED_FIELDS_CHUNK_SIZE = 2000
 
 
 class TaskType(Document):
-	pass
+	def on_update(self):
+		clear_task_type_config(self.name)
+
+		if self.has_derived_field_changes():
+			frappe.enqueue(
+				update_derived_fields_for_task_type,
+				queue="long",
+				timeout=3600,
+				job_id=f"task_type_derived_fields::{self.name}",
+				deduplicate=True,
+				enqueue_after_commit=True,
+				task_type=self.name,
+			)
+
+	def on_trash(self):
+		clear_task_type_config(self.name)
+
+	def has_derived_field_changes(self):
+		"""Whether a change in field mapping or status colors makes existing Tasks stale."""
+		before = self.get_doc_before_save()
+		if not before:
+			return bool(self.field_mapping or self.status_flow)
+
+		def mapping_key(doc):
+			return [
+				(row.source_path, row.target_field, row.label_field, row.label_text) for row in doc.field_mapping
+			]
+
+		def color_key(doc):
+			return [(row.workflow_status, row.color) for row in doc.status_flow]
+
+		return mapping_key(before) != mapping_key(self) or color_key(before) != color_key(self)
+
+
+def get_task_type_config(task_type):
+	"""
+	Compiled configuration of a Task Type, cached per site until the Task Type is saved:
+
+	- start_state: workflow status flagged as start state
+	- end_states: lower-cased workflow statuses flagged as end state
+	- colors: workflow status -> color
+	- mappings: field mappings with `source_path` pre-split and every hop resolved
+	  to the doctype it links to
+	"""
+	return frappe.cache().hget(
+		TASK_TYPE_CONFIG_CACHE_KEY, task_type, generator=lambda: compile_task_type_config(task_type)
+	)
+
+
+def clear_task_type_config(task_type=None):
+	if task_type:
+		frappe.cache().hdel(TASK_TYPE_CONFIG_CACHE_KEY, task_type)
+	else:
+		frappe.cache().delete_value(TASK_TYPE_CONFIG_CACHE_KEY)
+
+
+def compile_task_type_config(task_type):
+	if not frappe.db.exists("Task Type", task_type):
+		return None
+
+	doc = frappe.get_doc("Task Type", task_type)
+	status_flow = [row for row in doc.status_flow if row.workflow_status]
+
+	return {
+		"name": doc.name,
+		"start_state": next((row.workflow_status for row in status_flow if row.start_state), None),
+		"end_states": {row.workflow_status.lower() for row in status_flow if row.end_state},
+		"colors": {row.workflow_status: row.color for row in status_flow if row.color},
+		"mappings": [
+			compile_field_mapping(task_type, mapping) for mapping in doc.field_mapping if mapping.source_path
+		],
+	}
+
+
+def compile_field_mapping(task_type, mapping):
+	"""
+	Split `source_path` (e.g. "task_type_doc.customer.customer_primary_address") into
+	link hops and the final field. Each hop records the doctype it is read from and the
+	doctype it links to; Dynamic Links that can't be resolved up front keep the name of
+	the field holding the doctype so it can be read at runtime.
+	"""
+	parts = mapping.source_path.strip().split(".")
+	hops = []
+	doctype = "Task"
+
+	for fieldname in parts[:-1]:
+		hop = {"doctype": doctype, "fieldname": fieldname, "link_doctype": None, "doctype_field": None}
+		df = frappe.get_meta(doctype).get_field(fieldname) if doctype else None
+
+		if df and df.fieldtype == "Link":
+			hop["link_doctype"] = df.options
+		elif df and df.fieldtype == "Dynamic Link":
+			if doctype == "Task" and df.options == "type" and task_type != "Task":
+				# Tasks of this type always link to a document of the type's doctype
+				hop["link_doctype"] = task_type
+			else:
+				hop["doctype_field"] = df.options
+		elif doctype:
+			# Not a link field: nothing to follow, the mapped value resolves to ""
+			hop["invalid"] = True
+
+		hops.append(hop)
+		doctype = hop["link_doctype"]
+
+	return {
+		"source_path": mapping.source_path,
+		"target_field": mapping.target_field,
+		"label_field": mapping.label_field,
+		"label_text": mapping.label_text or "",
+		"hops": hops,
+		"field": parts[-1],
+	}
+
+
+def update_derived_fields_for_task_type(task_type, chunk_size=DERIVED_FIELDS_CHUNK_SIZE):
+	"""
+	Recompute mapped values, labels and status color of every Task of a Task Type.
+
+	Tasks are walked in chunks by name, mapped values are resolved with batched lookups
+	and only changed rows are written with multi-row UPDATEs. Tasks are not saved, so
+	Mongo sync and notifications are not triggered.
+	"""
+	from checktrack_connector.checktrack_connector.doctype.task.task import update_task_derived_fields
+
+	config = get_task_type_config(task_type)
+	if not config:
+		return
+
+	task = frappe.qb.DocType("Task")
+	if task_type == "Task":
+		# Tasks without a type use the "Task" Task Type
+		condition = task.type.isnull() | (task.type == "") | (task.type == "Task")
+	else:
+		condition = task.type == task_type
+
+	total = frappe.qb.from_(task).select(Count("*")).where(condition).run()[0][0]
+	processed = updated = 0
+	last_name = ""
+
+	while True:
+		names = (
+			frappe.qb.from_(task)
+			.select(task.name)
+			.where(condition & (task.name > last_name))
+			.orderby(task.name)
+			.limit(chunk_size)
+			.run(pluck=True)
+		)
+		if not names:
+			break
+
+		updated += update_task_derived_fields(names, config)
+		frappe.db.commit()
+
+		processed += len(names)
+		last_name = names[-1]
+		frappe.publish_progress(
+			cint(processed * 100 / total),
+			title=_("Updating Tasks"),
+			doctype="Task Type",
+			docname=task_type,
+			description=_("{0} of {1} tasks processed").format(processed, total),
+		)
+
+	frappe.logger().info(f"Recomputed derived fields of {processed} Tasks of Task Type '{task_type}', {updated} updated")
@@ -1,9 +1,12 @@
 # Copyright (c) 2025, satat tech llp and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests import IntegrationTestCase, UnitTestCase
 
+from checktrack_connector.checktrack_connector.doctype.task.test_task import make_test_task_type
+from checktrack_connector.checktrack_connector.doctype.task_type.task_type import get_task_type_config
+
 
 # On IntegrationTestCase, the doctype test records and all
 # link-field test record dependencies are recursively loaded
@@ -27,4 +30,23 @@ class IntegrationTestTaskType(IntegrationTestCase):
 	Use this class for testing interactions between multiple components.
 	"""
 
-	pass
+	def setUp(self):
+		make_test_task_type()
+
+	def test_compiled_config(self):
+		config = get_task_type_config("Task")
+
+		self.assertEqual(config["end_states"], {"completed"})
+		self.assertEqual(config["colors"]["Pending"], "#ffa00a")
+		mapping = config["mappings"][0]
+		self.assertEqual(mapping["field"], "employee_name")
+		self.assertEqual(mapping["hops"][0]["link_doctype"], "Employee")
+
+	def test_config_cleared_on_save(self):
+		get_task_type_config("Task")
+
+		task_type = frappe.get_doc("Task Type", "Task")
+		task_type.status_flow[0].color = "#000000"
+		task_type.save()
+
+		self.assertEqual(get_task_type_config("Task")["colors"][task_type.status_flow[0].workflow_status], "#000000")
@@ -0,0 +1,29 @@
+import click
+from frappe.commands import get_site, pass_context
+
+
+@click.command("import-customer-items")
+@click.argument("file_path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--chunk-size", type=int, default=None, help="Rows validated and inserted per transaction")
+@pass_context
+def import_customer_items(context, file_path, chunk_size=None):
+    """Import instruments from a CSV/XLSX file into Customer Items and the Customers' item tables."""
+    import frappe
+
+    from checktrack_connector.instrument_import import IMPORT_CHUNK_SIZE, import_instruments
+
+    frappe.init(site=get_site(context))
+    frappe.connect()
+    try:
+        summary = import_instruments(file_path, chunk_size or IMPORT_CHUNK_SIZE)
+    finally:
+        frappe.destroy()
+
+    click.echo(f"{summary.inserted} of {summary.rows} rows imported, {summary.conflict_count} conflicts")
+    for conflict in summary.conflicts:
+        click.echo(f"  row {conflict['row']}: {conflict['serial_no']} - {conflict['reason']}")
+    if summary.conflicts_file:
+        click.echo(f"All conflicts: {summary.conflicts_file}")
+
+
+commands = [import_customer_items]
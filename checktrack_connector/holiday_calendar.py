@@ -0,0 +1,49 @@
+from bisect import bisect_right
+from datetime import date
+
+import frappe
+from erpnext.setup.doctype.employee.employee import get_holiday_list_for_employee
+from frappe.utils import getdate
+
+HOLIDAY_CALENDAR_CACHE_KEY = "holiday_calendar"
+
+
+def get_holiday_ordinals(holiday_list):
+    """Sorted `date.toordinal()` values of a Holiday List, loaded once and cached until it's saved."""
+    if not holiday_list:
+        return []
+
+    return frappe.cache().hget(
+        HOLIDAY_CALENDAR_CACHE_KEY, holiday_list, generator=lambda: load_holiday_ordinals(holiday_list)
+    )
+
+
+def load_holiday_ordinals(holiday_list):
+    holidays = frappe.get_all("Holiday", filters={"parent": holiday_list}, pluck="holiday_date")
+    return sorted({getdate(holiday).toordinal() for holiday in holidays})
+
+
+def previous_working_day(holiday_list, schedule_date):
+    """`schedule_date` itself, or the closest earlier date that is not a holiday."""
+    return date.fromordinal(previous_working_ordinal(get_holiday_ordinals(holiday_list), getdate(schedule_date).toordinal()))
+
+
+def previous_working_ordinal(holidays, ordinal):
+    # Only the run of consecutive holidays ending at `ordinal` is walked
+    index = bisect_right(holidays, ordinal) - 1
+    while index >= 0 and holidays[index] == ordinal:
+        ordinal -= 1
+        index -= 1
+    return ordinal
+
+
+def get_schedule_holiday_list(sales_person, company):
+    """Holiday List of the Sales Person's Employee, else the Company default."""
+    employee = frappe.db.get_value("Sales Person", sales_person, "employee") if sales_person else None
+    if employee:
+        return get_holiday_list_for_employee(employee)
+    return frappe.get_cached_value("Company", company, "default_holiday_list")
+
+
+def clear_holiday_calendar(doc, method=None):
+    frappe.cache().hdel(HOLIDAY_CALENDAR_CACHE_KEY, doc.name)
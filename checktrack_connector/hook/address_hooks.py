@@ -1,25 +1,23 @@
 import frappe
 
+ADDRESS_FIELDS = ("address_line1", "address_line2", "city", "state", "pincode", "country")
+
+
+def format_address(address):
+    """One-line "line1, line2, city, state, pincode, country" of an Address doc or row, skipping blanks."""
+    return ", ".join(address.get(fieldname).strip() for fieldname in ADDRESS_FIELDS if address.get(fieldname))
+
+
+def get_formatted_address(address_name):
+    address = frappe.db.get_value("Address", address_name, ADDRESS_FIELDS, as_dict=True)
+    return format_address(address) if address else ""
+
+
 def update_customer_primary_address(doc, method):
-    linked_customers = frappe.get_all(
-        "Customer", filters={"customer_primary_address": doc.name}, fields=["name"]
+    if not doc.is_new() and not any(doc.has_value_changed(fieldname) for fieldname in ADDRESS_FIELDS):
+        return
+
+    # One UPDATE for every Customer using this address
+    frappe.db.set_value(
+        "Customer", {"customer_primary_address": doc.name}, "primary_address", format_address(doc)
     )
-    address_parts = []
-
-    if doc.address_line1:
-        address_parts.append(doc.address_line1.strip())
-    if doc.address_line2:
-        address_parts.append(doc.address_line2.strip())
-    if doc.city:
-        address_parts.append(doc.city.strip())
-    if doc.state:
-        address_parts.append(doc.state.strip())
-    if doc.pincode:
-        address_parts.append(doc.pincode.strip())
-    if doc.country:
-        address_parts.append(doc.country.strip())
-
-    full_address = ", ".join(address_parts)
-
-    for customer in linked_customers:
-        frappe.db.set_value("Customer", customer.name, "primary_address", full_address)
@@ -93,6 +93,12 @@ data_api_url = conf.get("data_api_url")
 # before_install = "checktrack_connector.install.before_install"
 # after_install = "checktrack_connector.install.after_install"
 
+# Cache
+# -----
+# Compiled Task Type configuration depends on doctype meta, drop it on `bench clear-cache`
+
+clear_cache = "checktrack_connector.checktrack_connector.doctype.task_type.task_type.clear_task_type_config"
+
 # Uninstallation
 # ------------
 
@@ -159,6 +165,12 @@ data_api_url = conf.get("data_api_url")
 # 	],
 # }
 
+scheduler_events = {
+	"all": [
+		"checktrack_connector.report_delivery.process_report_emails"
+	],
+}
+
 # Testing
 # -------
 
@@ -179,7 +191,15 @@ doc_events = {
         "on_save": "checktrack_connector.doctype.demo_pm_task.demo_pm_task.on_update",
     },
     "Task": {
-       "on_update": "checktrack_connector.sync.sync_or_update_task_in_mongo",
+       "on_update": [
+           "checktrack_connector.sync.sync_or_update_task_in_mongo",
+           "checktrack_connector.api.refresh_task_subtree_cache",
+           "checktrack_connector.task_graph.update_task_graph",
+       ],
+       "on_trash": [
+           "checktrack_connector.api.refresh_task_subtree_cache",
+           "checktrack_connector.task_graph.update_task_graph",
+       ],
        "on_submit": "checktrack_connector.sync.handle_task_submit",
        "on_cancel": "checktrack_connector.sync.handle_task_cancel"
     },
@@ -189,16 +209,40 @@ doc_events = {
     "*": {
         "on_request": "checktrack_connector.utils.validate_cors",
     },
-    "Maintenance Schedule": {
-        "on_submit": [
-           "checktrack_connector.checktrack_connector.doctype.maintenance_schedule.maintenance_schedule.create_schedule_logs",
-        ]
-    },
     "User": {
         "after_insert": "checktrack_connector.user.generate_api_credentials"
     },
     "Address": {
         "on_update": "checktrack_connector.hook.address_hooks.update_customer_primary_address"
+    },
+    "Service Report": {
+        "on_update": [
+            "checktrack_connector.api.clear_task_detail_cache",
+            "checktrack_connector.report_delivery.clear_report_pdf_cache",
+        ],
+        "on_trash": "checktrack_connector.api.clear_task_detail_cache"
+    },
+    "Preventive Maintenance Report": {
+        "on_update": [
+            "checktrack_connector.api.clear_task_detail_cache",
+            "checktrack_connector.report_delivery.clear_report_pdf_cache",
+        ],
+        "on_trash": "checktrack_connector.api.clear_task_detail_cache"
+    },
+    "Calibration Report": {
+        "on_update": [
+            "checktrack_connector.api.clear_task_detail_cache",
+            "checktrack_connector.report_delivery.clear_report_pdf_cache",
+        ],
+        "on_trash": "checktrack_connector.api.clear_task_detail_cache"
+    },
+    "Feedback Form": {
+        "on_update": "checktrack_connector.api.clear_task_detail_cache",
+        "on_trash": "checktrack_connector.api.clear_task_detail_cache"
+    },
+    "Holiday List": {
+        "on_update": "checktrack_connector.holiday_calendar.clear_holiday_calendar",
+        "on_trash": "checktrack_connector.holiday_calendar.clear_holiday_calendar"
     }
 }
 
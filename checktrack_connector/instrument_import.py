@@ -0,0 +1,242 @@
+import csv
+import os
+from datetime import date, datetime
+
+import frappe
+from frappe import _
+from frappe.utils import cint, getdate, now_datetime
+from openpyxl import load_workbook
+
+from checktrack_connector.utils import (
+    bulk_append_child_rows,
+    bulk_insert_docs,
+    get_private_file_path,
+    save_private_file,
+)
+
+IMPORT_FORMATS = ("csv", "xlsx")
+IMPORT_CHUNK_SIZE = 1000
+IMPORT_SUMMARY_CONFLICTS = 50
+
+# Columns read from the file, header names are matched case-insensitively ("Serial No" -> serial_no)
+INSTRUMENT_COLUMNS = ("serial_no", "customer", "item_code", "item_name", "model", "make", "amc_expiry_date")
+
+
+@frappe.whitelist()
+def import_customer_items(file_url):
+    """
+    Queue an import of instruments (one serial no per row) from an uploaded CSV or XLSX
+    file into Customer Items and the Customers' `customer_items` tables. Rows are
+    validated and inserted in chunks; the user is notified over realtime
+    (`instrument_import_ready`) with a summary and a file listing every conflict.
+    """
+    frappe.has_permission("Customer Items", "create", throw=True)
+    frappe.has_permission("Customer", "write", throw=True)
+
+    file_doc = frappe.get_doc("File", {"file_url": file_url})
+    file_doc.check_permission("read")
+    if get_import_format(file_doc.file_name) not in IMPORT_FORMATS:
+        frappe.throw(_("Import file must be one of {0}").format(", ".join(IMPORT_FORMATS)))
+
+    frappe.enqueue(
+        build_instrument_import,
+        queue="long",
+        timeout=3600,
+        user=frappe.session.user,
+        file_path=file_doc.get_full_path(),
+    )
+    return {"status": "queued", "message": _("Instrument import started. You will be notified when it is done.")}
+
+
+def build_instrument_import(user, file_path):
+    frappe.set_user(user)
+    summary = import_instruments(file_path)
+    frappe.publish_realtime("instrument_import_ready", summary, user=user)
+    return summary
+
+
+def import_instruments(file_path, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Stream `file_path` in chunks: rows are read lazily, each chunk is checked against
+    existing serial numbers, Customers and Items with one query per doctype and
+    inserted with multi-row INSERTs, then committed. Only the serial numbers seen so
+    far are kept, conflicts are written straight to a private CSV file.
+    """
+    total = count_import_rows(file_path)
+    timestamp = now_datetime().strftime("%Y%m%d-%H%M%S")
+    conflicts_name = f"instrument-import-conflicts-{timestamp}-{frappe.generate_hash(length=6)}.csv"
+    summary = frappe._dict(rows=0, inserted=0, conflict_count=0, conflicts=[], conflicts_file=None)
+    seen = {}  # serial_no -> first row number in the file
+    known = frappe._dict(customers=set(), items=set())
+
+    with open(get_private_file_path(conflicts_name), "w", newline="", encoding="utf-8") as f:
+        conflicts = csv.writer(f)
+        conflicts.writerow(["row", "serial_no", "reason"])
+
+        def add_conflict(row_no, serial_no, reason):
+            conflicts.writerow([row_no, serial_no, reason])
+            summary.conflict_count += 1
+            if len(summary.conflicts) < IMPORT_SUMMARY_CONFLICTS:
+                summary.conflicts.append({"row": row_no, "serial_no": serial_no, "reason": reason})
+
+        chunk = []
+        for row_no, row in iter_import_rows(file_path):
+            summary.rows += 1
+            serial_no, customer = row.get("serial_no"), row.get("customer")
+            if not serial_no or not customer:
+                add_conflict(row_no, serial_no, _("Serial No and Customer are mandatory"))
+            elif serial_no in seen:
+                add_conflict(row_no, serial_no, _("Duplicate of row {0}").format(seen[serial_no]))
+            else:
+                seen[serial_no] = row_no
+                chunk.append((row_no, row))
+
+            if len(chunk) >= chunk_size:
+                summary.inserted += import_instrument_chunk(chunk, known, add_conflict)
+                chunk = []
+                publish_import_progress(summary.rows, total)
+
+        summary.inserted += import_instrument_chunk(chunk, known, add_conflict)
+
+    if summary.conflict_count:
+        summary.conflicts_file = save_private_file(
+            conflicts_name, file_size=os.path.getsize(get_private_file_path(conflicts_name))
+        ).file_url
+    else:
+        os.remove(get_private_file_path(conflicts_name))
+    frappe.db.commit()
+
+    return summary
+
+
+def import_instrument_chunk(chunk, known, add_conflict):
+    """Validate one chunk of rows and insert the valid ones. Returns the number inserted."""
+    if not chunk:
+        return 0
+
+    serial_nos = [row["serial_no"] for _row_no, row in chunk]
+    registered = dict(
+        frappe.get_all(
+            "Customer Items", filters={"serial_no": ["in", serial_nos]}, fields=["serial_no", "customer"], as_list=True
+        )
+    )
+    load_known_names("Customer", {row["customer"] for _row_no, row in chunk}, known.customers)
+    load_known_names("Item", {row["item_code"] for _row_no, row in chunk if row.get("item_code")}, known.items)
+
+    valid = []
+    for row_no, row in chunk:
+        if row["serial_no"] in registered:
+            add_conflict(
+                row_no, row["serial_no"], _("Already registered to Customer {0}").format(registered[row["serial_no"]])
+            )
+        elif row["customer"] not in known.customers:
+            add_conflict(row_no, row["serial_no"], _("Customer {0} not found").format(row["customer"]))
+        elif row.get("item_code") and row["item_code"] not in known.items:
+            add_conflict(row_no, row["serial_no"], _("Item {0} not found").format(row["item_code"]))
+        else:
+            valid.append(row)
+
+    if valid:
+        insert_instruments(valid)
+    frappe.db.commit()
+    return len(valid)
+
+
+def load_known_names(doctype, names, known):
+    """Add the ones of `names` that exist to `known`, looking up only names not checked before."""
+    missing = list(names - known)
+    if missing:
+        known.update(frappe.get_all(doctype, filters={"name": ["in", missing]}, pluck="name"))
+
+
+def insert_instruments(rows):
+    """Customer Items records and the matching `customer_items` rows, bypassing Customer.validate."""
+    items = []
+    for row in rows:
+        item = frappe.new_doc("Customer Items")
+        item.update({
+            fieldname: row.get(fieldname)
+            for fieldname in ("serial_no", "customer", "item_code", "item_name", "model", "make")
+        })
+        items.append(item)
+    bulk_insert_docs(items)
+
+    bulk_append_child_rows(
+        "Customer",
+        "customer_items",
+        [
+            (row["customer"], {
+                fieldname: row.get(fieldname)
+                for fieldname in ("serial_no", "item_code", "item_name", "amc_expiry_date")
+            })
+            for row in rows
+        ],
+    )
+
+
+def iter_import_rows(file_path):
+    """(row number, row) pairs with INSTRUMENT_COLUMNS keys, read lazily from a CSV or XLSX file."""
+    if get_import_format(file_path) == "xlsx":
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            yield from iter_instrument_rows(rows)
+        finally:
+            workbook.close()
+    else:
+        with open(file_path, newline="", encoding="utf-8-sig") as f:
+            yield from iter_instrument_rows(csv.reader(f))
+
+
+def iter_instrument_rows(rows):
+    header = next(rows, None) or []
+    columns = [frappe.scrub(str(column or "").strip()) for column in header]
+    if "serial_no" not in columns or "customer" not in columns:
+        frappe.throw(_("Import file must have Serial No and Customer columns"))
+
+    positions = {column: columns.index(column) for column in INSTRUMENT_COLUMNS if column in columns}
+    for row_no, values in enumerate(rows, 2):
+        if not any(values):
+            continue
+        row = {
+            column: clean_import_value(values[position]) if position < len(values) else None
+            for column, position in positions.items()
+        }
+        if row.get("amc_expiry_date"):
+            row["amc_expiry_date"] = getdate(row["amc_expiry_date"])
+        yield row_no, row
+
+
+def clean_import_value(value):
+    """Stripped text, None for blanks. Spreadsheet numbers (serial nos) come back without a trailing ".0"."""
+    if value is None or isinstance(value, (date, datetime)):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip() or None
+
+
+def count_import_rows(file_path):
+    """Data rows in the file (blank lines included) for progress reporting, without loading it."""
+    if get_import_format(file_path) == "xlsx":
+        workbook = load_workbook(file_path, read_only=True)
+        try:
+            return max(cint(workbook.active.max_row) - 1, 0)
+        finally:
+            workbook.close()
+
+    with open(file_path, newline="", encoding="utf-8-sig") as f:
+        return max(sum(1 for _row in csv.reader(f)) - 1, 0)
+
+
+def get_import_format(file_name):
+    return os.path.splitext(file_name or "")[1].lstrip(".").lower()
+
+
+def publish_import_progress(processed, total):
+    if total:
+        frappe.publish_progress(
+            cint(min(processed, total) * 100 / total),
+            title=_("Importing Instruments"),
+            description=_("{0} of {1} rows processed").format(processed, total),
+        )
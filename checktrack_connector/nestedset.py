@@ -0,0 +1,324 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import frappe
+from frappe.query_builder.functions import Max
+from frappe.utils.nestedset import update_nsm
+
+
+@contextmanager
+def deferred_nested_set(*doctypes):
+    """
+    Suspend per-row nested set (lft/rgt) updates of the given tree doctypes and, on exit,
+    rebuild only the trees that had rows inserted or moved in the meantime.
+
+        with deferred_nested_set("Task"):
+            for row in rows:
+                frappe.get_doc(row).insert()
+
+    Nested blocks for the same doctype leave the rebuild to the outermost one.
+    """
+    if frappe.flags.deferred_nested_set is None:
+        frappe.flags.deferred_nested_set = {}
+
+    deferred = frappe.flags.deferred_nested_set
+    owned = [doctype for doctype in doctypes if doctype not in deferred]
+    for doctype in owned:
+        deferred[doctype] = set()
+
+    try:
+        yield
+    finally:
+        for doctype in owned:
+            anchors = deferred.pop(doctype)
+            if anchors:
+                rebuild_nested_set(doctype, anchors)
+
+
+def update_nested_set(doc):
+    """
+    `update_nsm` for tree doctypes, called from on_update: only new nodes and parent changes
+    touch lft/rgt. Inside `deferred_nested_set` the node's old and new parent are recorded
+    instead, so the rebuild knows which trees changed.
+    """
+    parent_field = doc.meta.nsm_parent_field
+    before = doc.get_doc_before_save()
+    if before and doc.lft and before.get(parent_field) == doc.get(parent_field):
+        return
+
+    deferred = frappe.flags.deferred_nested_set or {}
+    if doc.doctype in deferred:
+        deferred[doc.doctype].add(doc.get(parent_field) or doc.name)
+        if before and before.lft:
+            deferred[doc.doctype].add(before.get(parent_field) or doc.name)
+        return
+
+    # Doctypes with is_tree that don't extend NestedSet (e.g. Employee)
+    doc.nsm_parent_field = parent_field
+    update_nsm(doc)
+
+
+def rebuild_nested_set(doctype, anchors=None):
+    """
+    Recompute lft/rgt of the trees containing `anchors` (any node names), or of the whole
+    doctype without them, and write only the rows that changed.
+
+    Nodes without lft (inserted while deferred) are placed too, along with the trees of
+    their parents. The rows read are locked, and trees to the right are moved with one
+    relative UPDATE per rebuilt tree, so concurrent `update_nsm` calls wait for this
+    transaction instead of interleaving with it.
+    """
+    if anchors is None:
+        return rebuild_whole_nested_set(doctype)
+
+    meta = frappe.get_meta(doctype)
+    parent_field = meta.nsm_parent_field
+    table = frappe.qb.DocType(doctype)
+    columns = get_nested_set_columns(meta, table)
+
+    unplaced = {
+        row.name: row
+        for row in frappe.qb.from_(table)
+        .select(*columns)
+        .where(table.lft.isnull() | (table.lft == 0))
+        .for_update()
+        .run(as_dict=True)
+    }
+    anchors = set(anchors) | {row[parent_field] for row in unplaced.values() if row[parent_field]}
+
+    roots = get_nested_set_roots(doctype, table, parent_field, anchors, unplaced)
+    rows = dict(unplaced)
+    for lft, rgt in roots.values():
+        rows.update(
+            (row.name, row)
+            for row in frappe.qb.from_(table)
+            .select(*columns)
+            .where(table.lft[lft:rgt])
+            .for_update()
+            .run(as_dict=True)
+        )
+
+    if not rows:
+        return 0
+
+    children = defaultdict(list)
+    top = set()
+    for row in rows.values():
+        parent = row[parent_field]
+        if parent in rows:
+            children[parent].append(row.name)
+        elif not parent:
+            top.add(row.name)
+        else:
+            # Attached to a tree that wasn't locked (parent outside the anchors' trees)
+            return rebuild_whole_nested_set(doctype)
+
+    # Size change of every rebuilt tree (0 for a root moved under another node), trees
+    # right of it are moved by that much
+    sizes = {root: 2 * count_nested_set_nodes(root, children) if root in top else 0 for root in roots}
+    existing = sorted(roots, key=lambda root: roots[root][0])
+    for root in reversed(existing):
+        lft, rgt = roots[root]
+        delta = sizes[root] - (rgt - lft + 1)
+        if delta:
+            (
+                frappe.qb.update(table)
+                .set(table.lft, table.lft + delta)
+                .set(table.rgt, table.rgt + delta)
+                .where(table.lft > rgt)
+                .run()
+            )
+
+    bounds = {}
+    offset = 0
+    for root in existing:
+        lft, rgt = roots[root]
+        if root in top:
+            assign_nested_set([root], children, rows, lft + offset - 1, bounds)
+        offset += sizes[root] - (rgt - lft + 1)
+
+    # New top-level nodes go after everything else
+    end = frappe.qb.from_(table).select(Max(table.rgt)).where(table.name.notin(list(rows))).run()[0][0] or 0
+    for root in existing:
+        if root in bounds:
+            end = max(end, bounds[root][1])
+    assign_nested_set(top - set(roots), children, rows, end, bounds)
+
+    def current_bounds(row):
+        # Rows right of a rebuilt tree were just moved by the UPDATEs above
+        if not row.lft:
+            return (row.lft, row.rgt)
+        shift = sum(sizes[root] - (rgt - lft + 1) for root, (lft, rgt) in roots.items() if rgt < row.lft)
+        return (row.lft + shift, row.rgt + shift)
+
+    return write_nested_set(doctype, meta, rows, bounds, current_bounds)
+
+
+def rebuild_whole_nested_set(doctype):
+    """
+    Recompute lft/rgt of a whole tree in one (locking) read. Unlike
+    `frappe.utils.nestedset.rebuild_tree` this walks the tree in memory instead of
+    querying children per node. Siblings keep their current order and nodes without
+    lft go after them, so existing ranges shift as little as possible.
+    """
+    meta = frappe.get_meta(doctype)
+    parent_field = meta.nsm_parent_field
+    table = frappe.qb.DocType(doctype)
+    rows = {
+        row.name: row
+        for row in frappe.qb.from_(table).select(*get_nested_set_columns(meta, table)).for_update().run(as_dict=True)
+    }
+
+    children = defaultdict(list)
+    top = []
+    for row in rows.values():
+        parent = row[parent_field]
+        if parent in rows:
+            children[parent].append(row.name)
+        else:
+            top.append(row.name)
+
+    bounds = {}
+    assign_nested_set(top, children, rows, 0, bounds)
+    return write_nested_set(doctype, meta, rows, bounds, lambda row: (row.lft, row.rgt))
+
+
+def get_nested_set_columns(meta, table):
+    columns = [table.name, table[meta.nsm_parent_field], table.lft, table.rgt]
+    if meta.has_field("old_parent"):
+        columns.append(table.old_parent)
+    return columns
+
+
+def get_nested_set_roots(doctype, table, parent_field, anchors, unplaced):
+    """(lft, rgt) of the outermost ranges (top-level nodes as of the last update) containing the placed anchors, locked."""
+    placed = []
+    pending, seen = set(anchors), set()
+    while pending:
+        seen |= pending
+        rows = [unplaced[name] for name in pending if name in unplaced]
+        rows += frappe.get_all(
+            doctype,
+            filters={"name": ["in", list(pending - set(unplaced))]},
+            fields=["name", parent_field, "lft", "rgt"],
+        ) if pending - set(unplaced) else []
+        pending = set()
+        for row in rows:
+            if row.lft:
+                placed.append(row)
+            elif row[parent_field] and row[parent_field] not in seen:
+                pending.add(row[parent_field])
+
+    roots = {}
+    for row in sorted(placed, key=lambda row: row.lft):
+        if any(lft <= row.lft <= rgt for lft, rgt in roots.values()):
+            continue
+        root = (
+            frappe.qb.from_(table)
+            .select(table.name, table.lft, table.rgt)
+            .where((table.lft <= row.lft) & (table.rgt >= row.rgt))
+            .orderby(table.lft)
+            .limit(1)
+            .for_update()
+            .run(as_dict=True)
+        )
+        if root:
+            roots[root[0].name] = (root[0].lft, root[0].rgt)
+    return roots
+
+
+def count_nested_set_nodes(root, children):
+    count, stack = 0, [root]
+    while stack:
+        count += 1
+        stack.extend(children[stack.pop()])
+    return count
+
+
+def assign_nested_set(names, children, rows, counter, bounds):
+    """Number `names` and their subtrees depth-first after `counter`, into `bounds` (name -> (lft, rgt))."""
+
+    def sibling_order(name):
+        lft = rows[name].lft or 0
+        return (not lft, lft, name)
+
+    stack = [(name, False) for name in sorted(names, key=sibling_order, reverse=True)]
+    while stack:
+        name, closing = stack.pop()
+        counter += 1
+        if closing:
+            bounds[name] = (bounds[name], counter)
+            continue
+
+        bounds[name] = counter
+        stack.append((name, True))
+        stack.extend((child, False) for child in sorted(children[name], key=sibling_order, reverse=True))
+    return counter
+
+
+def write_nested_set(doctype, meta, rows, bounds, current_bounds):
+    parent_field = meta.nsm_parent_field
+    has_old_parent = meta.has_field("old_parent")
+
+    updates = {}
+    for name, (lft, rgt) in bounds.items():
+        row = rows[name]
+        changes = {}
+        if current_bounds(row) != (lft, rgt):
+            changes.update(lft=lft, rgt=rgt)
+        if has_old_parent and (row.old_parent or None) != (row[parent_field] or None):
+            changes["old_parent"] = row[parent_field] or ""
+        if changes:
+            updates[name] = changes
+
+    if len(bounds) < len(rows):
+        frappe.log_error(
+            title="Nested Set Rebuild Error",
+            message=f"{len(rows) - len(bounds)} {doctype} records are not reachable from a root (parent cycle)",
+        )
+
+    if updates:
+        frappe.db.bulk_update(doctype, updates, update_modified=False)
+    return len(updates)
+
+
+def benchmark_task_inserts(count=500, parents=10):
+    """
+    Compare Task insert throughput with per-row nested set updates and with
+    `deferred_nested_set`. Everything is rolled back.
+
+        bench --site <site> execute checktrack_connector.nestedset.benchmark_task_inserts --kwargs "{'count': 2000}"
+    """
+    results = {}
+    for mode in ("per_row", "deferred"):
+        start = time.perf_counter()
+        if mode == "deferred":
+            with deferred_nested_set("Task"):
+                insert_benchmark_tasks(count, parents)
+        else:
+            insert_benchmark_tasks(count, parents)
+        elapsed = time.perf_counter() - start
+        frappe.db.rollback()
+
+        results[mode] = {"seconds": round(elapsed, 3), "inserts_per_second": round(count / elapsed, 1)}
+
+    frappe.logger("nestedset").info(f"Task insert benchmark: {results}")
+    return results
+
+
+def insert_benchmark_tasks(count, parents):
+    """Insert Tasks the way on_update sees them, without the Mongo sync and notification hooks."""
+    parent_names = []
+    for i in range(count):
+        doc = frappe.get_doc({
+            "doctype": "Task",
+            "task_name": f"Nested Set Benchmark {i}",
+            "subject": f"Nested Set Benchmark {i}",
+            "is_group": int(i < parents),
+            "parent_task": parent_names[i % len(parent_names)] if parent_names and i >= parents else None,
+        })
+        doc.db_insert()
+        update_nested_set(doc)
+        if i < parents:
+            parent_names.append(doc.name)
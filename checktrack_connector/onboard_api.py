@@ -6,6 +6,7 @@ import json
 import requests
 from frappe.utils.file_manager import save_file
 from frappe.core.doctype.data_import.data_import import start_import, get_import_status
+from checktrack_connector.nestedset import deferred_nested_set
 
 USER_API_URL = frappe.get_hooks().get("user_api_url")
 DATA_API_URL = frappe.get_hooks().get("data_api_url")
@@ -347,7 +348,9 @@ def import_project(tenant_id, tenant_prefix, access_token,company_name):
                 import_doc_task.save()
                 frappe.db.commit()
 
-                start_import(import_doc_task.name)
+                # Tasks come in as one row each, rebuild their tree once at the end
+                with deferred_nested_set("Task"):
+                    start_import(import_doc_task.name)
 
                 status_info_task = get_import_status(import_doc_task.name)
 
@@ -0,0 +1,7 @@
+from checktrack_connector.nestedset import rebuild_nested_set
+
+
+def execute():
+    # lft/rgt of Task and Employee were never maintained, rebuild them before on_update starts relying on them
+    for doctype in ("Task", "Employee"):
+        rebuild_nested_set(doctype)
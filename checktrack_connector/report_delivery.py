@@ -0,0 +1,282 @@
+import hashlib
+import os
+from contextlib import suppress
+from functools import partial
+
+import frappe
+from frappe import _
+from frappe.utils import add_to_date, now_datetime
+from frappe.utils.pdf import get_pdf
+
+from checktrack_connector.utils import get_private_file_path, save_private_file
+
+REPORT_LETTERHEAD = "Neer Instruments"
+REPORT_EMAIL_ATTEMPTS = 3
+REPORT_EMAIL_RETRY_MINUTES = 5  # doubled after every failed attempt
+REPORT_PDF_PREFIX = "report-pdf-"
+
+# Email Queue statuses after which a mail will not be sent anymore
+EMAIL_QUEUE_FAILED = ("Error", "Expired", "Cancelled")
+
+# Per report doctype: recipient field, print format and mail text
+REPORT_DELIVERY = {
+    "Service Report": {
+        "email_field": "email",
+        "print_format": "Service Report",
+        "subject": "Service Report- {name}",
+        "message": "Dear Customer,<br><br>Please find attached the service report.<br><br>Regards,<br>Neer Instruments",
+    },
+    "Preventive Maintenance Report": {
+        "email_field": "email",
+        "print_format": "Preventive Maintenance Report",
+        "subject": "Preventive Maintenance Report- {name}",
+        "message": "Dear Customer,<br><br>Please find attached the preventive maintenance report.<br><br>Regards,<br>Neer Instruments",
+    },
+    "Calibration Report": {
+        "email_field": "customer_email",
+        "print_format": "Calibration Report",
+        "subject": "Calibration Certificate- {name}",
+        "message": "Dear Customer,<br><br>Please find attached the calibration certificate.<br><br>Regards,<br>Neer Instruments",
+    },
+}
+
+
+@frappe.whitelist()
+def send_report_email(doctype, name):
+    """Queue (again) the PDF email of a report, e.g. after a failed delivery."""
+    if doctype not in REPORT_DELIVERY:
+        frappe.throw(_("Email delivery is not set up for {0}").format(doctype))
+
+    doc = frappe.get_doc(doctype, name)
+    doc.check_permission("write")
+    if not queue_report_email(doc):
+        frappe.throw(_("No email address on {0}").format(name))
+    return {"status": "queued", "message": _("The report will be emailed shortly.")}
+
+
+def queue_report_email(doc):
+    """
+    Render and email `doc` as PDF in a background job once the current transaction
+    commits. Returns False when the report has no recipient.
+    """
+    if not doc.get(REPORT_DELIVERY[doc.doctype]["email_field"]):
+        return False
+
+    doc.db_set(
+        {"email_status": "Queued", "email_error": None, "email_retry_at": None, "email_attempts": 0, "email_queue": None},
+        update_modified=False,
+    )
+    enqueue_report_email(doc.doctype, doc.name)
+    return True
+
+
+def enqueue_report_email(doctype, name, attempt=1):
+    frappe.enqueue(
+        deliver_report_email,
+        queue=get_report_queue(),
+        timeout=600,
+        job_id=f"report_email::{doctype}::{name}::{attempt}",
+        deduplicate=True,
+        enqueue_after_commit=True,
+        doctype=doctype,
+        name=name,
+        attempt=attempt,
+    )
+
+
+def get_report_queue():
+    """
+    wkhtmltopdf is heavy, so renders go to a dedicated "pdf" queue when one is
+    configured (`workers` in common_site_config.json); its worker count bounds the
+    number of concurrent renders. Without it the short queue is used.
+    """
+    return "pdf" if "pdf" in (frappe.conf.workers or {}) else "short"
+
+
+def deliver_report_email(doctype, name, attempt=1):
+    """
+    Render the PDF and hand the mail to the Email Queue. The report stays "Queued"
+    until `process_report_emails` sees the Email Queue entry sent or failed. A failed
+    render / queueing is retried by the same job after an exponential backoff.
+    """
+    settings = REPORT_DELIVERY[doctype]
+    doc = frappe.get_doc(doctype, name)
+
+    try:
+        email_queue = frappe.sendmail(
+            recipients=[doc.get(settings["email_field"])],
+            subject=settings["subject"].format(name=doc.name),
+            message=settings["message"],
+            attachments=[{"fname": f"{doc.name}.pdf", "fcontent": get_report_pdf(doc)}],
+            reference_doctype=doctype,
+            reference_name=name,
+        )
+    except Exception as e:
+        frappe.db.rollback()
+        if attempt < REPORT_EMAIL_ATTEMPTS:
+            retry_at = add_to_date(now_datetime(), minutes=REPORT_EMAIL_RETRY_MINUTES * 2 ** (attempt - 1))
+            doc.db_set(
+                {"email_error": str(e), "email_attempts": attempt, "email_retry_at": retry_at}, update_modified=False
+            )
+        else:
+            doc.db_set(
+                {"email_status": "Failed", "email_error": str(e), "email_attempts": attempt, "email_retry_at": None},
+                update_modified=False,
+            )
+            frappe.log_error(frappe.get_traceback(), f"{doctype} Email Error")
+        frappe.db.commit()
+        return
+
+    if not email_queue:
+        # Every recipient was filtered out (e.g. unsubscribed), nothing will be sent
+        doc.db_set(
+            {"email_status": "Failed", "email_error": _("No recipient to send to"), "email_attempts": attempt},
+            update_modified=False,
+        )
+    else:
+        doc.db_set(
+            {"email_queue": email_queue.name, "email_error": None, "email_attempts": attempt, "email_retry_at": None},
+            update_modified=False,
+        )
+    frappe.db.commit()
+
+
+def process_report_emails():
+    """
+    Scheduled: re-enqueue deliveries whose retry is due and copy the outcome of
+    queued mails from their Email Queue entry to the report's email status.
+    """
+    for doctype in REPORT_DELIVERY:
+        retry_report_emails(doctype)
+        update_report_email_status(doctype)
+
+
+def retry_report_emails(doctype):
+    reports = frappe.get_all(
+        doctype,
+        filters={"email_status": "Queued", "email_retry_at": ["<=", now_datetime()]},
+        fields=["name", "email_attempts"],
+    )
+    for report in reports:
+        frappe.db.set_value(doctype, report.name, "email_retry_at", None, update_modified=False)
+        enqueue_report_email(doctype, report.name, report.email_attempts + 1)
+
+
+def update_report_email_status(doctype):
+    report = frappe.qb.DocType(doctype)
+    email_queue = frappe.qb.DocType("Email Queue")
+    rows = (
+        frappe.qb.from_(report)
+        .join(email_queue)
+        .on(email_queue.name == report.email_queue)
+        .select(report.name, email_queue.status, email_queue.error)
+        .where((report.email_status == "Queued") & email_queue.status.isin(["Sent", *EMAIL_QUEUE_FAILED]))
+        .run(as_dict=True)
+    )
+    for row in rows:
+        if row.status == "Sent":
+            values = {"email_status": "Sent", "email_error": None}
+        else:
+            values = {"email_status": "Failed", "email_error": row.error or row.status}
+        frappe.db.set_value(doctype, row.name, values, update_modified=False)
+
+
+@frappe.whitelist()
+def download_report_pdf(doctype, name, print_format=None, letterhead=None):
+    """Report PDF served from the cache, rendered only if the report changed since the last render."""
+    if doctype not in REPORT_DELIVERY:
+        frappe.throw(_("PDF download is not set up for {0}").format(doctype))
+
+    doc = frappe.get_doc(doctype, name)
+    doc.check_permission("read")
+    validate_report_print_settings(doctype, print_format, letterhead)
+
+    frappe.local.response.filename = f"{doc.name}.pdf"
+    frappe.local.response.filecontent = get_report_pdf(doc, print_format, letterhead)
+    frappe.local.response.type = "pdf"
+
+
+def validate_report_print_settings(doctype, print_format=None, letterhead=None):
+    """Only enabled Print Formats of the doctype and enabled Letter Heads, they are part of the cache key."""
+    if (
+        print_format
+        and print_format != REPORT_DELIVERY[doctype]["print_format"]
+        and not frappe.db.exists("Print Format", {"name": print_format, "doc_type": doctype, "disabled": 0})
+    ):
+        frappe.throw(_("Print Format {0} is not available for {1}").format(print_format, doctype))
+
+    if (
+        letterhead
+        and letterhead != REPORT_LETTERHEAD
+        and not frappe.db.exists("Letter Head", {"name": letterhead, "disabled": 0})
+    ):
+        frappe.throw(_("Letter Head {0} is not available").format(letterhead))
+
+
+def get_report_pdf(doc, print_format=None, letterhead=None):
+    with open(get_report_pdf_path(doc, print_format, letterhead), "rb") as f:
+        return f.read()
+
+
+def get_report_pdf_path(doc, print_format=None, letterhead=None):
+    """
+    Path of the report's PDF, cached as a private File attached to it. The file name is
+    the hash of (doctype, name, modified, print format, letterhead), so a render is
+    reused until any of them changes and stale ones are dropped by `clear_report_pdf_cache`.
+    """
+    print_format = print_format or REPORT_DELIVERY[doc.doctype]["print_format"]
+    letterhead = letterhead or REPORT_LETTERHEAD
+    key = "|".join(str(part) for part in (doc.doctype, doc.name, doc.modified, print_format, letterhead))
+    file_name = f"{REPORT_PDF_PREFIX}{hashlib.sha1(key.encode()).hexdigest()}.pdf"
+    path = get_private_file_path(file_name)
+
+    cached = frappe.db.exists("File", {"file_name": file_name, "is_private": 1})
+    if cached and os.path.exists(path):
+        return path
+
+    pdf = render_report_pdf(doc, print_format, letterhead)
+    with open(path, "wb") as f:
+        f.write(pdf)
+    if not cached:
+        # The File record is dropped if the transaction rolls back, don't leave the file behind
+        frappe.db.after_rollback.add(partial(remove_report_pdf, path))
+        save_private_file(
+            file_name,
+            content_hash=hashlib.md5(pdf).hexdigest(),
+            file_size=len(pdf),
+            attached_to_doctype=doc.doctype,
+            attached_to_name=doc.name,
+        )
+    return path
+
+
+def remove_report_pdf(path):
+    with suppress(FileNotFoundError):
+        os.remove(path)
+
+
+def render_report_pdf(doc, print_format, letterhead):
+    """PDF of the report with its print format (standard one if not installed) and letterhead."""
+    html = frappe.get_print(
+        doc.doctype,
+        doc.name,
+        print_format=print_format if frappe.db.exists("Print Format", print_format) else None,
+        doc=doc,
+        letterhead=letterhead,
+    )
+    return get_pdf(html)
+
+
+def clear_report_pdf_cache(doc, method=None):
+    """Delete the cached PDFs of a report once it changed, their key no longer matches."""
+    files = frappe.get_all(
+        "File",
+        filters={
+            "attached_to_doctype": doc.doctype,
+            "attached_to_name": doc.name,
+            "file_name": ["like", f"{REPORT_PDF_PREFIX}%"],
+        },
+        pluck="name",
+    )
+    for file in files:
+        frappe.delete_doc("File", file, ignore_permissions=True)
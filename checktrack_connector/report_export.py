@@ -0,0 +1,177 @@
+import hashlib
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import frappe
+from frappe import _
+from frappe.utils import cint, getdate, now_datetime
+from pypdf import PdfWriter
+
+from checktrack_connector.report_delivery import get_report_pdf_path
+from checktrack_connector.utils import get_private_file_path, save_private_file
+
+EXPORT_REPORT_FORMATS = ("pdf", "zip")
+REPORT_EXPORT_WORKERS = 4
+
+# Report date used for the period filter
+REPORT_DATE_FIELDS = {
+    "Service Report": "date",
+    "Preventive Maintenance Report": "date",
+    "Calibration Report": "date_of_calibration",
+}
+
+
+@frappe.whitelist()
+def export_reports(doctypes=None, customer=None, from_date=None, to_date=None, format="zip"):
+    """
+    Queue a bulk export of Service, Preventive Maintenance and/or Calibration Reports of
+    a customer and/or period as one merged PDF or a ZIP of PDFs. Reports are rendered in
+    parallel in a background job and the user is notified over realtime
+    (`report_export_ready`) with the file URL.
+    """
+    doctypes = frappe.parse_json(doctypes) if isinstance(doctypes, str) else doctypes
+    doctypes = doctypes or ["Service Report", "Calibration Report"]
+    if format not in EXPORT_REPORT_FORMATS:
+        frappe.throw(_("Export format must be one of {0}").format(", ".join(EXPORT_REPORT_FORMATS)))
+    for doctype in doctypes:
+        if doctype not in REPORT_DATE_FIELDS:
+            frappe.throw(_("{0} can not be exported").format(doctype))
+        frappe.has_permission(doctype, "read", throw=True)
+
+    frappe.enqueue(
+        build_report_export,
+        queue="long",
+        timeout=3600,
+        user=frappe.session.user,
+        doctypes=doctypes,
+        customer=customer,
+        from_date=from_date,
+        to_date=to_date,
+        format=format,
+    )
+    return {"status": "queued", "message": _("Report export started. You will be notified when the file is ready.")}
+
+
+def get_export_reports(doctypes, customer=None, from_date=None, to_date=None):
+    """(doctype, name) of the selected reports, oldest first within each doctype."""
+    reports = []
+    for doctype in doctypes:
+        date_field = REPORT_DATE_FIELDS[doctype]
+        filters = {}
+        if customer:
+            filters["customer_id"] = customer
+        if from_date and to_date:
+            filters[date_field] = ["between", [getdate(from_date), getdate(to_date)]]
+        elif from_date:
+            filters[date_field] = [">=", getdate(from_date)]
+        elif to_date:
+            filters[date_field] = ["<=", getdate(to_date)]
+
+        names = frappe.get_list(doctype, filters=filters, order_by=f"{date_field} asc, name asc", pluck="name")
+        reports.extend((doctype, name) for name in names)
+    return reports
+
+
+def build_report_export(user, doctypes, customer=None, from_date=None, to_date=None, format="zip"):
+    """
+    Render the reports in a pool of processes, each with its own site connection, and
+    bundle their cached PDFs from disk into one private File.
+    """
+    frappe.set_user(user)
+    reports = get_export_reports(doctypes, customer, from_date, to_date)
+    paths, failed = render_reports(reports, user)
+
+    timestamp = now_datetime().strftime("%Y%m%d-%H%M%S")
+    file_name = f"report-export-{timestamp}-{frappe.generate_hash(length=6)}.{format}"
+    path = get_private_file_path(file_name)
+    if format == "pdf":
+        write_merged_pdf(path, [paths[report] for report in reports if report in paths])
+    else:
+        write_report_zip(path, [(report, paths[report]) for report in reports if report in paths])
+
+    file_doc = save_private_file(file_name, content_hash=get_file_hash(path), file_size=os.path.getsize(path))
+    frappe.db.commit()
+
+    frappe.publish_realtime(
+        "report_export_ready",
+        {"file_url": file_doc.file_url, "reports": len(paths), "failed": failed, "format": format},
+        user=user,
+    )
+    return file_doc.file_url
+
+
+def render_reports(reports, user):
+    """PDF path per (doctype, name), rendered in parallel, and the names that failed to render."""
+    paths, failed = {}, []
+    if not reports:
+        return paths, failed
+
+    workers = min(cint(frappe.conf.report_export_workers) or REPORT_EXPORT_WORKERS, len(reports))
+    # spawn: forked children would share the parent's database and redis connections
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_report_worker,
+        initargs=(frappe.local.site, frappe.local.sites_path, user),
+    ) as executor:
+        futures = {executor.submit(render_report, *report): report for report in reports}
+        for done, future in enumerate(as_completed(futures), 1):
+            report = futures[future]
+            try:
+                paths[report] = future.result()
+            except Exception:
+                failed.append(report[1])
+                frappe.log_error(frappe.get_traceback(), f"{report[0]} Export Error")
+            publish_report_export_progress(done, len(reports))
+
+    return paths, failed
+
+
+def init_report_worker(site, sites_path, user):
+    frappe.init(site=site, sites_path=sites_path)
+    frappe.connect()
+    frappe.set_user(user)
+
+
+def render_report(doctype, name):
+    """Runs in a pool process: renders (or reuses) the report's cached PDF and returns its path."""
+    try:
+        path = get_report_pdf_path(frappe.get_doc(doctype, name))
+        frappe.db.commit()
+        return path
+    except Exception:
+        frappe.db.rollback()
+        raise
+
+
+def write_merged_pdf(path, pdf_paths):
+    writer = PdfWriter()
+    for pdf_path in pdf_paths:
+        writer.append(pdf_path)
+    with open(path, "wb") as f:
+        writer.write(f)
+    writer.close()
+
+
+def write_report_zip(path, reports):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for (doctype, name), pdf_path in reports:
+            zf.write(pdf_path, arcname=f"{frappe.scrub(doctype)}/{name}.pdf")
+
+
+def get_file_hash(path):
+    content_hash = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            content_hash.update(block)
+    return content_hash.hexdigest()
+
+
+def publish_report_export_progress(rendered, total):
+    frappe.publish_progress(
+        cint(rendered * 100 / total),
+        title=_("Exporting Reports"),
+        description=_("{0} of {1} reports rendered").format(rendered, total),
+    )
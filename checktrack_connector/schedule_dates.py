@@ -0,0 +1,55 @@
+from datetime import date
+
+from frappe.utils import cint, getdate
+
+from checktrack_connector.holiday_calendar import get_holiday_ordinals, previous_working_ordinal
+
+# Length of one period, shared by end date, visit count and periodicity checks
+DAYS_IN_PERIOD = {"Weekly": 7, "Monthly": 30, "Quarterly": 91, "Half Yearly": 182, "Yearly": 365}
+
+
+def get_visit_dates(start_date, end_date, no_of_visits, holiday_list=None):
+    """
+    Visit dates spread evenly over (start_date, end_date]: visit i falls on
+    start + i * days // no_of_visits, moved back to the previous working day of the
+    holiday list and never later than end_date.
+    """
+    return get_visit_dates_for_schedules(
+        [{"start_date": start_date, "end_date": end_date, "no_of_visits": no_of_visits, "holiday_list": holiday_list}]
+    )[0]
+
+
+def get_visit_dates_for_schedules(schedules):
+    """
+    `get_visit_dates` for many schedules at once. Each schedule is a dict with start_date,
+    end_date, no_of_visits and holiday_list; every holiday list is read once.
+    """
+    holidays = {}
+    for schedule in schedules:
+        holiday_list = schedule.get("holiday_list")
+        if holiday_list not in holidays:
+            holidays[holiday_list] = get_holiday_ordinals(holiday_list)
+
+    return [
+        [
+            date.fromordinal(ordinal)
+            for ordinal in get_visit_ordinals(
+                getdate(schedule["start_date"]).toordinal(),
+                getdate(schedule["end_date"]).toordinal(),
+                cint(schedule["no_of_visits"]),
+                holidays[schedule.get("holiday_list")],
+            )
+        ]
+        for schedule in schedules
+    ]
+
+
+def get_visit_ordinals(start, end, no_of_visits, holidays):
+    if no_of_visits <= 0 or end <= start:
+        return []
+
+    days = end - start
+    ordinals = [start + visit * days // no_of_visits for visit in range(1, no_of_visits + 1)]
+    if holidays:
+        ordinals = [previous_working_ordinal(holidays, ordinal) for ordinal in ordinals]
+    return [min(ordinal, end) for ordinal in ordinals]
@@ -9,7 +9,7 @@ def get_last_value(url):
     parts = url.rstrip('/').split('/')
     return parts[-1]
 
-def send_notification(doc, docname, prefix, tenantId):
+def send_notification(doc, docname, prefix, tenantId, access_token=None):
     try:
         current_assign_to = doc.assign_to
 
@@ -83,7 +83,7 @@ def send_notification(doc, docname, prefix, tenantId):
 
         # Send notification via API
         url = f"{USER_API_URL}/notification/send"
-        access_token = get_app_admin_bearer_auth()
+        access_token = access_token or get_app_admin_bearer_auth()
         notification_headers = {
             "Authorization": access_token,
             'Content-Type': 'application/json; charset=UTF-8',
@@ -313,6 +313,24 @@ def send_status_change_notification_for_submit_cancel(doc, docname, prefix, tena
     except Exception:
         frappe.log_error(frappe.get_traceback(), f"Status change notification failed for {status_action}")
       
+def sync_tasks_to_mongo(task_names):
+    """
+    Sync Tasks created by bulk inserts, which skip the Task hooks, to MongoDB and send
+    their assignment notifications, logging in to the CheckTrack API once for all of them.
+    """
+    access_token = get_app_admin_bearer_auth()
+
+    for task_name in task_names:
+        try:
+            doc = frappe.get_doc("Task", task_name)
+            # Notifications go out for new assignments only
+            doc.flags.in_insert = True
+            sync_task_to_mongo(doc, "after_insert", access_token=access_token)
+            frappe.db.commit()
+        except Exception:
+            frappe.db.rollback()
+            frappe.log_error(frappe.get_traceback(), f"Failed to sync task {task_name}")
+
 def sync_or_update_project_in_mongo(doc, method):
     if doc.mongo_project_id:
         response = update_project_in_mongo(doc, method)
@@ -351,7 +369,7 @@ def get_app_admin_bearer_auth():
         frappe.log_error(frappe.get_traceback(), "get_app_admin_bearer_auth failed")
         frappe.throw("Failed to generate admin token.") 
 
-def sync_task_to_mongo(doc, method):
+def sync_task_to_mongo(doc, method, access_token=None):
 
     USER_API_URL = frappe.get_hooks().get("user_api_url")
     DATA_API_URL = frappe.get_hooks().get("data_api_url")
@@ -427,7 +445,7 @@ def sync_task_to_mongo(doc, method):
     try:
         prefix = company_doc.prefix
         url = f"{DATA_API_URL}/{prefix}_tasks"
-        access_token = get_app_admin_bearer_auth()
+        access_token = access_token or get_app_admin_bearer_auth()
         task_headers = {
             "Authorization": access_token,
             "Content-Type": "application/json"
@@ -444,7 +462,7 @@ def sync_task_to_mongo(doc, method):
             frappe.logger().error(f"[SYNC FAILED] Task '{doc.name}' created in MongoDB but no ID returned.")
 
         # Send assignment notification
-        notification_res = send_notification(doc,doc.name,prefix,company_doc.tenant_id)
+        notification_res = send_notification(doc,doc.name,prefix,company_doc.tenant_id,access_token)
         
         # For submit/cancel events, send appropriate status notification
         if method in ['on_submit', 'on_cancel']:
@@ -0,0 +1,155 @@
+import csv
+import hashlib
+import io
+import json
+import os
+
+import frappe
+from frappe import _
+from frappe.query_builder.functions import Count, GroupConcat
+from frappe.utils import add_days, cint, getdate, now_datetime
+
+from checktrack_connector.utils import get_private_file_path, save_private_file
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_DATE_FIELDS = ("creation", "modified", "due_date")
+EXPORT_CHUNK_SIZE = 2000
+
+TASK_EXPORT_FIELDS = [
+    "name", "task_name", "subject", "project", "company", "type", "task_type_doc",
+    "workflow_status", "priority", "assign_to", "parent_task", "due_date",
+    "exp_start_date", "exp_end_date", "progress", "expected_time", "actual_time",
+    "docstatus", "mongo_task_id", "owner", "creation", "modified",
+]
+
+
+@frappe.whitelist()
+def export_tasks(format="ndjson", project=None, status=None, from_date=None, to_date=None, date_field="creation"):
+    """
+    Queue a Task export (NDJSON or CSV) with optional project, workflow status and
+    date filters. The file is streamed to a private File in a background job and
+    the user is notified over realtime (`task_export_ready`) with its URL.
+    """
+    if not frappe.has_permission("Task", "export"):
+        frappe.throw(_("Not permitted to export Tasks"), frappe.PermissionError)
+    if format not in EXPORT_FORMATS:
+        frappe.throw(_("Export format must be one of {0}").format(", ".join(EXPORT_FORMATS)))
+    if date_field not in EXPORT_DATE_FIELDS:
+        frappe.throw(_("Date field must be one of {0}").format(", ".join(EXPORT_DATE_FIELDS)))
+
+    frappe.enqueue(
+        build_task_export,
+        queue="long",
+        timeout=3600,
+        user=frappe.session.user,
+        format=format,
+        project=project,
+        status=status,
+        from_date=from_date,
+        to_date=to_date,
+        date_field=date_field,
+    )
+    return {"status": "queued", "message": _("Task export started. You will be notified when the file is ready.")}
+
+def apply_export_filters(query, task, project=None, status=None, from_date=None, to_date=None, date_field="creation"):
+    if project:
+        query = query.where(task.project == project)
+    if status:
+        query = query.where(task.workflow_status == status)
+    if from_date:
+        query = query.where(task[date_field] >= getdate(from_date))
+    if to_date:
+        # inclusive upper bound for datetime columns
+        query = query.where(task[date_field] < add_days(getdate(to_date), 1))
+    return query
+
+def get_task_export_query(**filters):
+    """Task rows with their watchers folded into one column each, ordered by name."""
+    task = frappe.qb.DocType("Task")
+    watcher = frappe.qb.DocType("Watchers Table")
+
+    query = (
+        frappe.qb.from_(task)
+        .left_join(watcher)
+        .on((watcher.parent == task.name) & (watcher.parenttype == "Task") & (watcher.parentfield == "watchers"))
+        .select(
+            *[task[field] for field in TASK_EXPORT_FIELDS],
+            GroupConcat(watcher.employee).as_("watchers"),
+            GroupConcat(watcher.employee_name).as_("watcher_names"),
+        )
+        .groupby(task.name)
+        .orderby(task.name)
+    )
+    return apply_export_filters(query, task, **filters)
+
+def count_export_rows(**filters):
+    task = frappe.qb.DocType("Task")
+    query = apply_export_filters(frappe.qb.from_(task).select(Count(task.name)), task, **filters)
+    return query.run()[0][0]
+
+def build_task_export(user, format="ndjson", project=None, status=None, from_date=None, to_date=None, date_field="creation"):
+    """
+    Stream matching Tasks through an unbuffered (server-side) cursor straight into a
+    private file, so memory stays constant regardless of the number of rows.
+    """
+    frappe.set_user(user)
+    filters = dict(project=project, status=status, from_date=from_date, to_date=to_date, date_field=date_field)
+    total = count_export_rows(**filters)
+
+    file_name = f"task-export-{now_datetime().strftime('%Y%m%d-%H%M%S')}-{frappe.generate_hash(length=6)}.{format}"
+    path = get_private_file_path(file_name)
+    content_hash = hashlib.md5()
+    columns = TASK_EXPORT_FIELDS + ["watchers", "watcher_names"]
+    exported = 0
+
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if format == "csv":
+            header = io.StringIO()
+            csv.writer(header).writerow(columns)
+            write_export_text(f, header.getvalue(), content_hash)
+
+        buffer = []
+        with frappe.db.unbuffered_cursor():
+            rows = get_task_export_query(**filters).run(as_dict=True, as_iterator=True)
+            for row in rows:
+                buffer.append(row)
+                if len(buffer) >= EXPORT_CHUNK_SIZE:
+                    exported += write_export_chunk(f, format, columns, buffer, content_hash)
+                    buffer = []
+                    publish_export_progress(exported, total)
+            exported += write_export_chunk(f, format, columns, buffer, content_hash)
+
+    file_doc = save_private_file(file_name, content_hash=content_hash.hexdigest(), file_size=os.path.getsize(path))
+    frappe.db.commit()
+
+    frappe.publish_realtime(
+        "task_export_ready",
+        {"file_url": file_doc.file_url, "rows": exported, "format": format},
+        user=user,
+    )
+    return file_doc.file_url
+
+def write_export_chunk(f, format, columns, rows, content_hash):
+    if not rows:
+        return 0
+
+    if format == "csv":
+        chunk = io.StringIO()
+        csv.DictWriter(chunk, fieldnames=columns, extrasaction="ignore").writerows(rows)
+        write_export_text(f, chunk.getvalue(), content_hash)
+    else:
+        write_export_text(f, "".join(json.dumps(row, default=str) + "\n" for row in rows), content_hash)
+
+    return len(rows)
+
+def write_export_text(f, text, content_hash):
+    f.write(text)
+    content_hash.update(text.encode("utf-8"))
+
+def publish_export_progress(exported, total):
+    if total:
+        frappe.publish_progress(
+            cint(exported * 100 / total),
+            title=_("Exporting Tasks"),
+            description=_("{0} of {1} tasks exported").format(exported, total),
+        )
@@ -0,0 +1,180 @@
+from collections import deque
+
+import frappe
+
+from checktrack_connector.checktrack_connector.doctype.task_type.task_type import get_task_type_config
+
+TASK_GRAPH_CACHE_KEY = "task_graph"
+
+
+@frappe.whitelist()
+def get_project_dependency_graph(project):
+    """
+    Dependency analysis of a project's Tasks (`depends_on` rows):
+
+    - order: Tasks in topological order, prerequisites first
+    - cycles: Tasks on (or between) dependency cycles, left out of `order`
+    - critical_path: longest chain of Tasks weighted by expected_time
+    - blocked: open Tasks waiting for an open prerequisite
+    """
+    frappe.has_permission("Project", "read", doc=project, throw=True)
+
+    graph = get_task_graph(project)
+    if graph.get("analysis") is None:
+        graph["analysis"] = analyse_task_graph(graph)
+        frappe.cache().hset(TASK_GRAPH_CACHE_KEY, project, graph)
+
+    return graph["analysis"]
+
+
+def get_task_graph(project):
+    graph = frappe.cache().hget(TASK_GRAPH_CACHE_KEY, project)
+    if graph is None:
+        graph = load_task_graph(project)
+        frappe.cache().hset(TASK_GRAPH_CACHE_KEY, project, graph)
+    return graph
+
+
+def load_task_graph(project):
+    """Nodes and edges of a project in two queries: Tasks, then all their dependency rows."""
+    nodes = {
+        row.name: get_task_graph_node(row)
+        for row in frappe.get_all(
+            "Task",
+            filters={"project": project},
+            fields=["name", "type", "workflow_status", "expected_time"],
+        )
+    }
+
+    task = frappe.qb.DocType("Task")
+    depends_on = frappe.qb.DocType("Task Depends On")
+    rows = (
+        frappe.qb.from_(depends_on)
+        .join(task)
+        .on(task.name == depends_on.parent)
+        .select(depends_on.parent, depends_on.task)
+        .where((task.project == project) & (depends_on.parenttype == "Task") & (depends_on.parentfield == "depends_on"))
+        .run()
+    )
+
+    # task -> prerequisites, only within the project
+    edges = {name: [] for name in nodes}
+    for name, prerequisite in rows:
+        if prerequisite in nodes and prerequisite not in edges[name]:
+            edges[name].append(prerequisite)
+
+    return {"nodes": nodes, "edges": edges, "analysis": None}
+
+
+def get_task_graph_node(task):
+    config = get_task_type_config(task.type or "Task")
+    status = (task.workflow_status or "").lower()
+    return {
+        "expected_time": task.expected_time or 0,
+        "workflow_status": task.workflow_status,
+        "done": bool(config and status in config["end_states"]),
+    }
+
+
+def analyse_task_graph(graph):
+    nodes, edges = graph["nodes"], graph["edges"]
+
+    dependents = {name: [] for name in nodes}
+    in_degree = {name: len(prerequisites) for name, prerequisites in edges.items()}
+    for name, prerequisites in edges.items():
+        for prerequisite in prerequisites:
+            dependents[prerequisite].append(name)
+
+    # Kahn's algorithm, longest (expected_time weighted) path alongside
+    queue = deque(sorted(name for name, degree in in_degree.items() if not degree))
+    order = []
+    distance = {}
+    via = {}
+    while queue:
+        name = queue.popleft()
+        order.append(name)
+
+        prerequisites = edges[name]
+        best = max(prerequisites, key=distance.__getitem__, default=None)
+        distance[name] = nodes[name]["expected_time"] + (distance[best] if best else 0)
+        via[name] = best
+
+        for dependent in dependents[name]:
+            in_degree[dependent] -= 1
+            if not in_degree[dependent]:
+                queue.append(dependent)
+
+    critical_path = []
+    if distance:
+        name = max(distance, key=distance.__getitem__)
+        critical_time = distance[name]
+        while name:
+            critical_path.append(name)
+            name = via[name]
+        critical_path.reverse()
+    else:
+        critical_time = 0
+
+    cycles = get_cyclic_tasks(set(nodes) - set(order), edges, dependents)
+    blocked = sorted(
+        name
+        for name, prerequisites in edges.items()
+        if not nodes[name]["done"]
+        and (name in cycles or any(not nodes[prerequisite]["done"] for prerequisite in prerequisites))
+    )
+
+    return {
+        "order": order,
+        "cycles": sorted(cycles),
+        "critical_path": critical_path,
+        "critical_path_time": critical_time,
+        "blocked": blocked,
+    }
+
+
+def get_cyclic_tasks(remaining, edges, dependents):
+    """
+    Tasks Kahn's algorithm could not order are on a cycle or depend on one. Peeling off
+    the ones nothing in the remainder depends on leaves the cycles (and chains between them).
+    """
+    out_degree = {name: sum(dependent in remaining for dependent in dependents[name]) for name in remaining}
+    queue = deque(name for name, degree in out_degree.items() if not degree)
+    while queue:
+        name = queue.popleft()
+        remaining.discard(name)
+        for prerequisite in edges[name]:
+            if prerequisite in remaining:
+                out_degree[prerequisite] -= 1
+                if not out_degree[prerequisite]:
+                    queue.append(prerequisite)
+    return remaining
+
+
+def update_task_graph(doc, method=None):
+    """Patch cached project graphs with the saved / deleted Task instead of reloading them."""
+    before = doc.get_doc_before_save()
+    projects = {doc.project, before.project if before else None} - {None, ""}
+
+    for project in projects:
+        graph = frappe.cache().hget(TASK_GRAPH_CACHE_KEY, project)
+        if graph is None:
+            continue
+
+        if method != "on_trash" and doc.project == project and before and before.project != project:
+            # Rows of other Tasks pointing at a Task joining the project weren't loaded
+            frappe.cache().hdel(TASK_GRAPH_CACHE_KEY, project)
+            continue
+
+        nodes, edges = graph["nodes"], graph["edges"]
+        if method == "on_trash" or doc.project != project:
+            nodes.pop(doc.name, None)
+            edges.pop(doc.name, None)
+            for prerequisites in edges.values():
+                if doc.name in prerequisites:
+                    prerequisites.remove(doc.name)
+        else:
+            nodes[doc.name] = get_task_graph_node(doc)
+            edges[doc.name] = list(dict.fromkeys(row.task for row in doc.depends_on if row.task in nodes))
+
+        graph["analysis"] = None
+        frappe.cache().hset(TASK_GRAPH_CACHE_KEY, project, graph)
@@ -1,4 +1,9 @@
+from collections import defaultdict
+
 import frappe
+from frappe.model.naming import set_new_name
+from frappe.query_builder.functions import Max
+from frappe.utils import now
 
 ALLOWED_ORIGINS = [
     "http://localhost:8002",  # Local development
@@ -50,4 +55,114 @@ def add_cors_headers(response):
         response.headers["Access-Control-Allow-Headers"] = "Authorization, Content-Type, X-Requested-With, Accept"
         response.headers["Access-Control-Allow-Credentials"] = "true"
 
-    return response
\ No newline at end of file
+    return response
+
+def get_private_file_path(file_name):
+    """Absolute path for a new file in the site's private files folder."""
+    return frappe.get_site_path("private", "files", file_name)
+
+def save_private_file(file_name, content_hash=None, file_size=None, attached_to_doctype=None, attached_to_name=None):
+    """
+    Register a file that was already written to `get_private_file_path(file_name)`
+    as a private File doc, without reading it back into memory.
+    """
+    file_doc = frappe.get_doc({
+        "doctype": "File",
+        "file_name": file_name,
+        "file_url": f"/private/files/{file_name}",
+        "is_private": 1,
+        "content_hash": content_hash,
+        "file_size": file_size,
+        "attached_to_doctype": attached_to_doctype,
+        "attached_to_name": attached_to_name,
+    })
+    file_doc.insert(ignore_permissions=True)
+    return file_doc
+
+def bulk_insert_docs(docs):
+    """
+    Insert new documents of one doctype, with their child rows, using multi-row INSERTs.
+
+    Names and standard fields are set here. Validation, controller methods and
+    doc_events are not run, so callers set derived values themselves.
+    """
+    timestamp = now()
+    rows = defaultdict(list)
+
+    for doc in docs:
+        for d in [doc, *doc.get_all_children()]:
+            if d is not doc:
+                d.parent = doc.name
+                d.parenttype = doc.doctype
+            if not d.name:
+                set_new_name(d)
+            d.owner = d.modified_by = frappe.session.user
+            d.creation = d.modified = timestamp
+            d.docstatus = d.docstatus or 0
+            rows[d.doctype].append(d.get_valid_dict(convert_dates_to_str=True))
+
+    for doctype, values in rows.items():
+        fields = list(values[0])
+        frappe.db.bulk_insert(doctype, fields, [[value.get(field) for field in fields] for value in values])
+
+    return [doc.name for doc in docs]
+
+def bulk_append_child_rows(parenttype, parentfield, rows):
+    """
+    Append child rows to existing documents with multi-row INSERTs, without loading or
+    saving the parents. `rows` are (parent name, {fieldname: value}) pairs; each
+    parent's numbering continues after its existing rows and its `modified` is bumped.
+    """
+    if not rows:
+        return
+
+    child_doctype = frappe.get_meta(parenttype).get_field(parentfield).options
+    parents = list(dict.fromkeys(parent for parent, _values in rows))
+    table = frappe.qb.DocType(child_doctype)
+    last_idx = dict(
+        frappe.qb.from_(table)
+        .select(table.parent, Max(table.idx))
+        .where(table.parent.isin(parents) & (table.parenttype == parenttype) & (table.parentfield == parentfield))
+        .groupby(table.parent)
+        .run()
+    )
+
+    timestamp = now()
+    fieldnames = list(dict.fromkeys(fieldname for _parent, values in rows for fieldname in values))
+    fields = [
+        "name", "parent", "parenttype", "parentfield", "idx", "owner", "modified_by", "creation", "modified",
+        *fieldnames,
+    ]
+    values = []
+    for parent, row in rows:
+        idx = last_idx[parent] = (last_idx.get(parent) or 0) + 1
+        values.append([
+            frappe.generate_hash(length=10), parent, parenttype, parentfield, idx,
+            frappe.session.user, frappe.session.user, timestamp, timestamp,
+            *(row.get(fieldname) for fieldname in fieldnames),
+        ])
+    frappe.db.bulk_insert(child_doctype, fields, values)
+
+    parent_table = frappe.qb.DocType(parenttype)
+    frappe.qb.update(parent_table).set(parent_table.modified, timestamp).where(parent_table.name.isin(parents)).run()
+
+def reserve_names(prefix, count, digits=5):
+    """
+    Reserve `count` consecutive names of a naming series with one counter update,
+    the bulk counterpart of `frappe.model.naming.getseries`.
+    """
+    if count <= 0:
+        return []
+
+    series = frappe.qb.DocType("Series")
+    current = (
+        frappe.qb.from_(series).select(series.current).where(series.name == prefix).for_update().run()
+    )
+    if current:
+        start = current[0][0] or 0
+        frappe.qb.update(series).set(series.current, start + count).where(series.name == prefix).run()
+    else:
+        start = 0
+        frappe.qb.into(series).columns("name", "current").insert(prefix, count).run()
+
+    return [f"{prefix}{str(number).zfill(digits)}" for number in range(start + 1, start + count + 1)]